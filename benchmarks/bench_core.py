@@ -0,0 +1,239 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Benchmarks the mapper, diff and MIDI-determination paths against a synthetic show
+
+Run this file directly (not as a module of the plugin), from an environment where Linux Show
+Player and its dependencies are importable:
+
+    python benchmarks/bench_core.py --cues 1000 --output results.json
+
+The results are written as JSON: the parameters used, and the timings (in seconds) of each
+benchmark.
+'''
+
+# pylint: disable=missing-docstring, import-outside-toplevel, wrong-import-position
+
+import argparse
+import copy
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import (
+    add_plugin_to_path,
+    create_cues,
+    create_qapplication,
+    generate_session_config,
+    generate_show,
+    install_plugins,
+)
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'max': max(timings),
+        'runs': repeat,
+    }
+
+def positions(cues):
+    '''The top, middle and bottom change cues of a show'''
+    change_cues = [cue for cue in cues if cue.type == 'DcaChangeCue']
+    return {
+        'top': change_cues[0],
+        'middle': change_cues[len(change_cues) // 2],
+        'bottom': change_cues[-1],
+    }
+
+def bench_mapper(plugin, cues, repeat):
+    from dca_plotter.mapper.model import DcaMappingModel
+
+    results = {}
+
+    def load():
+        plugin._mapping_model = DcaMappingModel() # pylint: disable=protected-access
+        for cue in cues:
+            plugin.mapper().append_cuerow(cue)
+
+    results['append_cuerow (full load)'] = time_call(load, repeat)
+
+    for position, cue in positions(cues).items():
+        original = copy.deepcopy(cue.dca_changes)
+        edited = copy.deepcopy(original)
+        edited[0]['name'] = 'Edited'
+        edited[0]['add'] = edited[0]['add'][1:]
+
+        # As the plugin's CuePropertyDispatcher would, once the changes have settled
+        def amend(cue=cue, original=original, edited=edited):
+            for dca_changes in (edited, original):
+                cue.dca_changes = dca_changes
+                plugin.mapper().amend_cuerow(cue, 'dca_changes', dca_changes)
+
+        results[f'amend_cuerow ({position}, edit and revert)'] = time_call(amend, repeat)
+
+    def move(from_index, to_index):
+        cue = cues.pop(from_index)
+        cues.insert(to_index, cue)
+        for index, each in enumerate(cues):
+            each.index = index
+        plugin.mapper().move_cuerow(cue, to_index)
+
+    middle = len(cues) // 2
+    results['move_cuerow (top to middle and back)'] = time_call(
+        lambda: (move(1, middle), move(middle, 1)), repeat)
+
+    # As the ListLayout does when a selection of cues is dragged: the cues are all moved, and
+    # then the plugin brings the mapper into line with them at once.
+    block = min(20, middle - 1)
+
+    def move_block(from_index, to_index):
+        moved = cues[from_index:from_index + block]
+        del cues[from_index:from_index + block]
+        cues[to_index:to_index] = moved
+        for index, each in enumerate(cues):
+            each.index = index
+        plugin.mapper().move_cuerows(moved)
+
+    results[f'move_cuerows ({block} cues, top to middle and back)'] = time_call(
+        lambda: (move_block(1, middle), move_block(middle, 1)), repeat)
+    results['consistent after move_cuerows'] = mapper_matches_rebuild(plugin, cues)
+
+    # And when a selection of cues is deleted
+    removed = cues[middle:middle + block]
+    del cues[middle:middle + block]
+    for index, each in enumerate(cues):
+        each.index = index
+    results[f'remove_cuerows ({block} cues, middle)'] = time_call(
+        lambda: plugin.mapper().remove_cuerows(removed), 1)
+    results['consistent after remove_cuerows'] = mapper_matches_rebuild(plugin, cues)
+
+    # Put the show back as it was, for the benchmarks that follow
+    cues[middle:middle] = removed
+    for index, each in enumerate(cues):
+        each.index = index
+    load()
+
+    return results
+
+def mapper_matches_rebuild(plugin, cues):
+    '''Whether the mapper holds the same as one built afresh from the cues'''
+    from dca_plotter.mapper.model import DcaMappingModel, _change_tuples_derive
+
+    def derive_all(mapper):
+        return [(cuerow.cue.id, _change_tuples_derive(cuerow)) for cuerow in mapper.root.children]
+
+    # pylint: disable=protected-access
+    mapper = plugin._mapping_model
+    plugin._mapping_model = DcaMappingModel()
+    for cue in cues:
+        plugin.mapper().append_cuerow(cue)
+    rebuilt = derive_all(plugin.mapper())
+    plugin._mapping_model = mapper
+
+    return derive_all(mapper) == rebuilt
+
+def bench_tracker(plugin, cues, repeat):
+    from dca_plotter.tracker.desk_shadow import DeskShadow
+    from dca_plotter.tracker.model import (
+        DcaTrackingModel,
+        compile_deliveries,
+        resolve_deliveries,
+    )
+
+    results = {}
+    change_cues = positions(cues)
+    tracker = DcaTrackingModel(False)
+
+    # Give the tracker a realistic "currently active" to calculate from
+    for cue in cues[:len(cues) // 2]:
+        tracker.call_cue(cue)
+
+    for position, cue in change_cues.items():
+        results[f'calculate_diff_from_mapper ({position})'] = time_call(
+            lambda cue=cue: tracker.calculate_diff_from_mapper(cue.id), repeat)
+        results[f'calculate_diff ({position})'] = time_call(
+            lambda cue=cue: tracker.calculate_diff(cue.dca_changes), repeat)
+
+    results['cancel_everything'] = time_call(tracker.cancel_everything, repeat)
+
+    # As the tracker transmits: the changes are resolved to their MIDI (which it memoises),
+    # then checked against what the desk is believed to already have.
+    for name, changes in (
+            ('cancel_everything', tracker.cancel_everything()),
+            ('middle cue', tracker.calculate_diff_from_mapper(change_cues['middle'].id))):
+        results[f'resolve_deliveries ({name})'] = time_call(
+            lambda changes=changes: resolve_deliveries(changes, 'bench'), repeat)
+
+        resolved = resolve_deliveries(changes, 'bench')
+        results[f'compile_deliveries ({name}, resolved)'] = time_call(
+            lambda changes=changes, resolved=resolved:
+            compile_deliveries(changes, 'bench', DeskShadow(), resolved=resolved), repeat)
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--cues', type=int, default=1000)
+    parser.add_argument('--dcas', type=int, default=8)
+    parser.add_argument('--inputs', type=int, default=32)
+    parser.add_argument('--fx', type=int, default=4)
+    parser.add_argument('--roles', type=int, default=8)
+    parser.add_argument('--choirs', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='File to write the results to (default: stdout)')
+    args = parser.parse_args()
+
+    app = create_qapplication() # pylint: disable=unused-variable
+    add_plugin_to_path()
+
+    session_config = generate_session_config(args.dcas, args.inputs, args.fx,
+                                             args.roles, args.choirs, args.seed)
+    plugin = install_plugins(session_config)
+    cues = create_cues(generate_show(session_config, args.cues, seed=args.seed))
+
+    results = {}
+    results.update(bench_mapper(plugin, cues, args.repeat))
+    results.update(bench_tracker(plugin, cues, args.repeat))
+
+    output = json.dumps({
+        'parameters': vars(args),
+        'results': results,
+    }, indent=4)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
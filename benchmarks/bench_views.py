@@ -0,0 +1,183 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Benchmarks the drawing of the mapper, tracker and cue views against synthetic shows
+
+Run this file directly (not as a module of the plugin), from an environment where Linux Show
+Player and its dependencies are importable. The views are drawn using Qt's "offscreen"
+platform, so no display is needed:
+
+    python benchmarks/bench_views.py --sizes 100 300 1200 --output results.json
+
+For each show size, and each view, the following are measured:
+* laying out the view (`_recalculate_cell_size`)
+* painting a frame
+* scrolling by a step (and repainting)
+* finding the index under a point (`indexAt`)
+* the peak memory allocated (by Python) whilst populating, laying out and painting the view
+'''
+
+# pylint: disable=missing-docstring, import-outside-toplevel, wrong-import-position, protected-access
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_core import time_call
+from synthetic import (
+    add_plugin_to_path,
+    create_cues,
+    create_qapplication,
+    generate_session_config,
+    generate_show,
+    install_plugins,
+)
+
+VIEW_WIDTH = 1280
+VIEW_HEIGHT = 800
+INDEXAT_SAMPLES = 100
+
+def bench_view(app, view, model, repeat):
+    # pylint: disable=no-name-in-module
+    from PyQt5.QtCore import QPoint
+
+    view.setModel(model)
+    view.resize(VIEW_WIDTH, VIEW_HEIGHT)
+    view.show()
+    app.processEvents()
+
+    results = {}
+
+    def layout():
+        view._cell_sizes_dirty = True
+        view._recalculate_cell_size()
+    results['layout'] = time_call(layout, repeat)
+
+    results['paint'] = time_call(view.viewport().repaint, repeat)
+
+    scrollbar = view.verticalScrollBar()
+    def scroll():
+        if scrollbar.value() + scrollbar.singleStep() > scrollbar.maximum():
+            scrollbar.setValue(0)
+        scrollbar.setValue(scrollbar.value() + scrollbar.singleStep())
+        view.viewport().repaint()
+    results['scroll_step'] = time_call(scroll, repeat)
+
+    points = [QPoint(VIEW_WIDTH * num // INDEXAT_SAMPLES, VIEW_HEIGHT * num // INDEXAT_SAMPLES)
+              for num in range(INDEXAT_SAMPLES)]
+    def index_at():
+        for point in points:
+            view.indexAt(QPoint(point))
+    results['indexAt (per call)'] = {
+        key: value / INDEXAT_SAMPLES if key != 'runs' else value
+        for key, value in time_call(index_at, repeat).items()
+    }
+
+    view.hide()
+    return results
+
+def bench_size(app, args, cue_count):
+    from dca_plotter.cue.model import DcaCueModel
+    from dca_plotter.cue.view import DcaCueView
+    from dca_plotter.mapper.model import DcaMappingModel
+    from dca_plotter.mapper.view import DcaMappingView
+    from dca_plotter.tracker.model import DcaTrackingModel
+    from dca_plotter.tracker.view import DcaTrackingView
+
+    session_config = generate_session_config(args.dcas, args.inputs, args.fx,
+                                             args.roles, args.choirs, args.seed)
+    plugin = install_plugins(session_config)
+    results = {}
+
+    tracemalloc.start()
+
+    # Mapper
+    start = time.perf_counter()
+    cues = create_cues(generate_show(session_config, cue_count, seed=args.seed))
+    plugin._mapping_model = DcaMappingModel()
+    for cue in cues:
+        plugin.mapper().append_cuerow(cue)
+    populate_time = time.perf_counter() - start
+    results['DcaMappingView'] = bench_view(app, DcaMappingView(), plugin.mapper(), args.repeat)
+    results['DcaMappingView']['populate'] = populate_time
+    results['DcaMappingView']['peak_memory'] = tracemalloc.get_traced_memory()[1]
+
+    # Tracker (the current row being that part-way through the show)
+    tracemalloc.reset_peak()
+    tracker = DcaTrackingModel(True)
+    for cue in cues[:len(cues) // 2]:
+        tracker._apply_cue(cue)
+    plugin._tracking_model = tracker
+    tracker_view = DcaTrackingView()
+    results['DcaTrackingView'] = bench_view(app, tracker_view, tracker, args.repeat)
+    results['DcaTrackingView']['peak_memory'] = tracemalloc.get_traced_memory()[1]
+    tracker_view.deinitialise()
+
+    # Cue (settings page)
+    tracemalloc.reset_peak()
+    cue = [cue for cue in cues if cue.type == 'DcaChangeCue'][-1]
+    cue_model = DcaCueModel()
+    cue_model.deserialise(cue.dca_changes, cue.id)
+    results['DcaCueView'] = bench_view(app, DcaCueView(), cue_model, args.repeat)
+    results['DcaCueView']['peak_memory'] = tracemalloc.get_traced_memory()[1]
+
+    tracemalloc.stop()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 300, 600, 1200],
+                        help='The numbers of cues in the shows to benchmark')
+    parser.add_argument('--dcas', type=int, default=8)
+    parser.add_argument('--inputs', type=int, default=32)
+    parser.add_argument('--fx', type=int, default=4)
+    parser.add_argument('--roles', type=int, default=8)
+    parser.add_argument('--choirs', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='File to write the results to (default: stdout)')
+    args = parser.parse_args()
+
+    app = create_qapplication()
+    add_plugin_to_path()
+
+    results = {}
+    for cue_count in args.sizes:
+        results[cue_count] = bench_size(app, args, cue_count)
+
+    output = json.dumps({
+        'parameters': vars(args),
+        'results': results,
+    }, indent=4)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Synthetic shows - and enough of a plugin environment to load them into - for benchmarking
+
+Everything here is for use by the scripts in this folder, which run the plugin's models
+outside of Linux Show Player. As such, a QApplication must exist - see
+`create_qapplication()` - before anything from the plugin is imported.
+'''
+
+# pylint: disable=missing-docstring, import-outside-toplevel
+
+import os
+import random
+import sys
+
+def create_qapplication():
+    '''Creates a QApplication that doesn't need a display'''
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    # pylint: disable=no-name-in-module
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+def add_plugin_to_path():
+    '''Makes the plugin importable as `dca_plotter`, as it would be from within LiSP'''
+    plugins_folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if plugins_folder not in sys.path:
+        sys.path.insert(0, plugins_folder)
+
+
+def generate_session_config(dca_count=8, inputs=32, fx=4, roles=8, choirs=4, seed=0):
+    '''Generates the plugin's session configuration for a synthetic show'''
+    rng = random.Random(seed)
+
+    config = {
+        'assigns': {
+            'role': {},
+            'choir': {},
+            'input': [{'name': f'Mic {num + 1}', 'in': num + 1} for num in range(inputs)],
+            'fx': [{'name': f'FX {num + 1}', 'in': num + 1} for num in range(fx)],
+        },
+        'dca_count': dca_count,
+        'message_order': {},
+    }
+
+    for num in range(roles):
+        assigns = [('input', rng.randint(1, inputs)) for _ in range(2)]
+        config['assigns']['role'][f'role#{num:02}'] = {
+            'name': f'Role {num + 1}',
+            'default': assigns[0],
+            'assigns': assigns,
+        }
+
+    for num in range(choirs):
+        config['assigns']['choir'][f'choir#{num:02}'] = {
+            'name': f'Choir {num + 1}',
+            'assigns': [('input', channel) for channel in rng.sample(range(1, inputs + 1),
+                                                                    min(inputs, 6))],
+        }
+
+    return config
+
+def generate_show(session_config, cue_count=1000, reset_every=50, seed=0):
+    '''Generates a show: a list of either `None` (a reset cue) or the `dca_changes` of a cue
+
+    Each change cue moves a few strips between, onto, and off of a few DCAs, and renames them;
+    much as a real show does.
+    '''
+    rng = random.Random(seed)
+    dca_count = session_config['dca_count']
+    strips = [('input', num + 1) for num in range(len(session_config['assigns']['input']))]
+    strips += [('fx', num + 1) for num in range(len(session_config['assigns']['fx']))]
+    strips += [('role', role_id) for role_id in session_config['assigns']['role']]
+    choirs = [('choir', choir_id) for choir_id in session_config['assigns']['choir']]
+
+    active = [[] for _ in range(dca_count)]
+    show = []
+    for cue_num in range(cue_count):
+        if reset_every and cue_num % reset_every == reset_every - 1:
+            active = [[] for _ in range(dca_count)]
+            show.append(None)
+            continue
+
+        dca_changes = [{'name': False, 'add': [], 'rem': []} for _ in range(dca_count)]
+        for dca_num in rng.sample(range(dca_count), rng.randint(1, min(3, dca_count))):
+            changes = dca_changes[dca_num]
+
+            for strip in rng.sample(active[dca_num], min(len(active[dca_num]), rng.randint(0, 2))):
+                changes['rem'].append(strip)
+                active[dca_num].remove(strip)
+
+            in_use = [strip for dca in active for strip in dca]
+            for strip in rng.sample(strips, rng.randint(1, 3)):
+                if strip not in in_use:
+                    changes['add'].append(strip)
+                    active[dca_num].append(strip)
+
+            if choirs and rng.random() < 0.1:
+                changes['add'].append(rng.choice(choirs))
+
+            changes['name'] = f'Scene {cue_num} {dca_num + 1}'
+
+        show.append(dca_changes)
+    return show
+
+def create_cues(show):
+    '''Creates the plugin's cues for a generated show'''
+    from dca_plotter.cue.change_cue import DcaChangeCue
+    from dca_plotter.cue.reset_cue import DcaResetCue
+
+    cues = []
+    for index, dca_changes in enumerate(show):
+        if dca_changes is None:
+            cue = DcaResetCue(None)
+        else:
+            cue = DcaChangeCue(None)
+            cue.dca_changes = dca_changes
+        cue.index = index
+        cues.append(cue)
+    return cues
+
+
+class BenchProfile:
+    '''A desk profile that builds NRPN-like messages for assigns and mutes, and SysEx for names
+
+    Every command builds different messages, so what is sent can be decoded again (as a
+    VirtualDesk does). Each type of channel has its own MIDI channel; the NRPN's MSB is the
+    channel's number and its LSB the DCA (or zero, for a mute).
+    '''
+    CHANNELS = {'input': 0, 'fx': 1, 'dca': 2}
+
+    def parameter_values(self, _):
+        # pylint: disable=no-self-use
+        return {'channelType': ['input', 'fx', 'dca']}
+
+    def build_command(self, command, args):
+        if command == 'setName':
+            name = [ord(char) & 0x7F for char in args['asciiString'][:8].ljust(8)]
+            return [{'type': 'sysex', 'data': [0x7D, args['channelNum']] + name}]
+
+        if command == 'assignToDca':
+            dca_num = args['dcaNum']
+            value = 1 if args['assignAction'] == 'assign' else 0
+        else:
+            dca_num = 0
+            value = 1 if args['muteAction'] == 'mute' else 0
+
+        channel = self.CHANNELS[args['channelType']]
+        return [
+            {'type': 'control_change', 'channel': channel, 'control': 99, 'value': args['channelNum'] & 0x7F},
+            {'type': 'control_change', 'channel': channel, 'control': 98, 'value': dca_num & 0x7F},
+            {'type': 'control_change', 'channel': channel, 'control': 6, 'value': value},
+        ]
+
+class BenchMidi:
+    '''Stands in for the Midi plugin, counting what it is sent'''
+    def __init__(self):
+        self.sent = 0
+
+    def is_loaded(self):
+        # pylint: disable=no-self-use
+        return True
+
+    def send(self, _, __):
+        self.sent += 1
+
+class BenchFixtureControl:
+    '''Stands in for the MidiFixtureControl plugin'''
+    def __init__(self):
+        self.SessionConfig = {'dca_device': 'bench'} # pylint: disable=invalid-name
+        self._profile = BenchProfile()
+
+    def get_patched_output(self, device_id):
+        # pylint: disable=no-self-use
+        return device_id
+
+    def get_profile(self, _):
+        return self._profile
+
+    def is_loaded(self):
+        # pylint: disable=no-self-use
+        return True
+
+class BenchTracker:
+    '''Stands in for the tracker, where something only needs to tell it to regenerate'''
+    def regenerate_current(self):
+        pass
+
+    def schedule_regeneration(self):
+        pass
+
+def install_plugins(session_config):
+    '''Makes the stand-in plugins available through `get_plugin()`
+
+    Returns the stand-in for the DcaPlotter plugin.
+    '''
+    import lisp.plugins
+    from lisp.core.signal import Signal
+    from dca_plotter.dca_plotter import DcaPlotter
+    from dca_plotter.roles.roles_switcher_model import RolesSwitcherModel
+
+    class BenchDcaPlotter:
+        # pylint: disable=invalid-name
+        Config = {
+            'blanking_text': '-',
+            'input_channel_count': 16,
+            'fx_channel_count': 4,
+            'prearm_silent_changes': False,
+            'desk_feedback_port': '',
+        }
+        choirs_containing = DcaPlotter.choirs_containing
+        is_choir_member = DcaPlotter.is_choir_member
+        resolve_choir = DcaPlotter.resolve_choir
+        resolve_desk_channel = DcaPlotter.resolve_desk_channel
+        resolve_role = DcaPlotter.resolve_role
+        resolve_strip = DcaPlotter.resolve_strip
+        _rebuild_choir_index = DcaPlotter._rebuild_choir_index
+        _rebuild_desk_channels = DcaPlotter._rebuild_desk_channels
+
+        initialised = Signal()
+
+        def __init__(self):
+            self.SessionConfig = session_config
+            self._roles_switcher_model = RolesSwitcherModel()
+            self._roles_switcher_model.renew(session_config)
+            self._rebuild_choir_index()
+            self._substitutions = {}
+            self._rebuild_desk_channels()
+            self._mapping_model = None
+            self._tracking_model = BenchTracker()
+
+        def is_loaded(self):
+            # pylint: disable=no-self-use
+            return True
+
+        def mapper(self):
+            return self._mapping_model
+
+        def mapper_enabled(self):
+            return self._mapping_model is not None
+
+        def tracker(self):
+            return self._tracking_model
+
+    plugin = BenchDcaPlotter()
+    lisp.plugins.PLUGINS['DcaPlotter'] = plugin
+    lisp.plugins.PLUGINS['MidiFixtureControl'] = BenchFixtureControl()
+    lisp.plugins.PLUGINS['Midi'] = BenchMidi()
+    return plugin
@@ -0,0 +1,163 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Runs a synthetic show through the tracker into a virtual desk, reporting how the desk fares
+
+Run this file directly (not as a module of the plugin), from an environment where Linux Show
+Player and its dependencies are importable:
+
+    python benchmarks/virtual_show.py --cues 1000 --output results.json
+
+No time is actually waited: the desk's clock is advanced by how long each message would take on
+the wire, and by `--cue-interval` seconds between cues. The results are written as JSON: the
+parameters used, what the desk received, processed, dropped and was late with, and the
+differences between what the tracker believes is on the desk and what actually is - as compared
+after every cue, once the desk has processed what it was sent.
+'''
+
+# pylint: disable=missing-docstring, import-outside-toplevel, wrong-import-position
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import (
+    BenchProfile,
+    add_plugin_to_path,
+    create_cues,
+    create_qapplication,
+    generate_session_config,
+    generate_show,
+    install_plugins,
+)
+
+# MIDI is transmitted at 31,250 baud, with 10 bits on the wire for every byte
+MIDI_SECONDS_PER_BYTE = 10 / 31250
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class Cable:
+    '''Carries messages to the desk, advancing the clock by the time each takes on the wire'''
+    def __init__(self, desk, clock):
+        self._desk = desk
+        self._clock = clock
+
+    def send(self, port, message):
+        self._clock.now += len(message.bytes()) * MIDI_SECONDS_PER_BYTE
+        self._desk.send(port, message)
+
+def run_show(cues, desk, clock, cue_interval):
+    '''Calls each cue in turn, returning how many messages each cue had dropped or processed
+    late, and where the desk then differed from what the tracker believed'''
+    from dca_plotter.tracker.model import DcaTrackingModel
+
+    tracker = DcaTrackingModel(False)
+    tracker.use_midi_output(Cable(desk, clock))
+
+    troubled = []
+    for cue in cues:
+        before = desk.report()
+        tracker.call_cue(cue)
+        clock.now += cue_interval
+        after = desk.report()
+        troubled.append({
+            'index': cue.index,
+            'dropped': after['dropped'] - before['dropped'],
+            'late': after['late'] - before['late'],
+            'discrepancies': desk.discrepancies(tracker),
+        })
+
+    return troubled
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--cues', type=int, default=1000)
+    parser.add_argument('--dcas', type=int, default=8)
+    parser.add_argument('--inputs', type=int, default=32)
+    parser.add_argument('--fx', type=int, default=4)
+    parser.add_argument('--roles', type=int, default=8)
+    parser.add_argument('--choirs', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cue-interval', type=float, default=1.0,
+                        help='Seconds between one cue and the next')
+    parser.add_argument('--buffer-size', type=int, default=256)
+    parser.add_argument('--processing-delay', type=float, default=0.0005,
+                        help='Seconds the desk takes to process each message')
+    parser.add_argument('--late-after', type=float, default=0.05,
+                        help='Seconds after which a message is considered late')
+    parser.add_argument('--output', help='File to write the results to (default: stdout)')
+    args = parser.parse_args()
+
+    app = create_qapplication() # pylint: disable=unused-variable
+    add_plugin_to_path()
+
+    session_config = generate_session_config(args.dcas, args.inputs, args.fx,
+                                             args.roles, args.choirs, args.seed)
+    install_plugins(session_config)
+    cues = create_cues(generate_show(session_config, args.cues, seed=args.seed))
+
+    from dca_plotter.virtual_desk import VirtualDesk
+
+    clock = SimulatedClock()
+    desk = VirtualDesk(BenchProfile(), args.buffer_size, args.processing_delay,
+                       args.late_after, clock)
+    troubled = run_show(cues, desk, clock, args.cue_interval)
+
+    disagreeing = [cue for cue in troubled if cue['discrepancies']]
+    first_disagreeing = None
+    if disagreeing:
+        first_disagreeing = {
+            'index': disagreeing[0]['index'],
+            'discrepancies': [repr(each) for each in disagreeing[0]['discrepancies'][:10]],
+        }
+
+    worst_cue = max(troubled, default=None,
+                    key=lambda cue: cue['dropped'] + cue['late'] + len(cue['discrepancies']))
+    if worst_cue:
+        worst_cue = dict(worst_cue, discrepancies=len(worst_cue['discrepancies']))
+
+    output = json.dumps({
+        'parameters': vars(args),
+        'results': {
+            'desk': desk.report(),
+            'worst_cue': worst_cue,
+            'discrepancies': sum(len(cue['discrepancies']) for cue in troubled),
+            'cues_disagreeing': len(disagreeing),
+            'first_disagreeing_cue': first_disagreeing,
+        },
+    }, indent=4)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
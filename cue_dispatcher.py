@@ -0,0 +1,101 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=missing-docstring
+
+# pylint: disable=no-name-in-module
+from PyQt5.QtCore import QTimer
+
+# pylint: disable=import-error
+from lisp.core.signal import Connection
+from lisp.plugins import get_plugin
+
+class CuePropertyDispatcher:
+    '''Passes on the changes to cues' properties that the mapper needs to know about
+
+    Each cue is listened to once (rather than once by each model), and only changes to the
+    properties below are acted on. Changes arriving in quick succession - as when the cue
+    settings dialog applies - are coalesced, so the mapper is updated just once per cue.
+    '''
+
+    DISPATCHED_PROPERTIES = ('dca_changes', 'force_clear')
+
+    # How long (in milliseconds) to wait for further changes before passing them on
+    COALESCE_INTERVAL = 20
+
+    def __init__(self):
+        self._cues = {}
+        self._pending = {}
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.COALESCE_INTERVAL)
+        self._timer.timeout.connect(self.flush)
+
+    def close(self):
+        '''Stops listening to all cues, passing on anything still pending first'''
+        self.flush()
+        for cue in list(self._cues.values()):
+            self.unwatch(cue)
+
+    def flush(self):
+        '''Passes on pending changes now, rather than waiting'''
+        self._timer.stop()
+        pending = self._pending
+        self._pending = {}
+
+        mapper = get_plugin('DcaPlotter').mapper()
+        if not mapper:
+            return
+
+        # Several cues changed at once are brought up to date in one pass
+        if len(pending) > 1:
+            with mapper.transaction():
+                self._dispatch(mapper, pending)
+        else:
+            self._dispatch(mapper, pending)
+
+    def unwatch(self, cue):
+        if self._cues.pop(cue.id, None):
+            cue.property_changed.disconnect(self._on_property_changed)
+        self._pending.pop(cue.id, None)
+
+    def watch(self, cue):
+        if cue.id in self._cues:
+            return
+        self._cues[cue.id] = cue
+        cue.property_changed.connect(self._on_property_changed, Connection.QtQueued)
+
+    def _on_property_changed(self, cue, property_name, _):
+        if property_name not in self.DISPATCHED_PROPERTIES:
+            return
+        self._pending.setdefault(cue.id, set()).add(property_name)
+        self._timer.start()
+
+    def _dispatch(self, mapper, pending):
+        for cue_id, properties in pending.items():
+            cue = self._cues.get(cue_id)
+            if not cue:
+                continue
+            # The value is read now, as only the last of several changes matters
+            for property_name in self.DISPATCHED_PROPERTIES:
+                if property_name in properties:
+                    mapper.amend_cuerow(cue, property_name, getattr(cue, property_name))
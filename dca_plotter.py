@@ -22,28 +22,46 @@
 
 # pylint: disable=missing-docstring
 
+import logging
+import os
+import uuid
+
 # pylint: disable=no-name-in-module
-from PyQt5.QtCore import QT_TRANSLATE_NOOP
-from PyQt5.QtWidgets import QAction
+from PyQt5.QtCore import QT_TRANSLATE_NOOP, QTimer
+from PyQt5.QtWidgets import QAction, QFileDialog, QInputDialog, QMessageBox
 
 # pylint: disable=import-error
+from lisp import app_dirs
 from lisp.core.plugin import Plugin
 from lisp.core.signal import Signal
+from lisp.plugins import get_plugin
 from lisp.plugins.list_layout.layout import ListLayout
 from lisp.ui.settings.app_configuration import AppConfigurationDialog
 from lisp.ui.settings.session_configuration import SessionConfigurationDialog
 from lisp.ui.ui_utils import translate
 
 from dca_plotter.config.channel_assign import ChannelAssignConfig
+from dca_plotter.cue_dispatcher import CuePropertyDispatcher
 from dca_plotter.cue.change_cue import DcaChangeCue
 from dca_plotter.cue.reset_cue import DcaResetCue
 from dca_plotter.dca_plotter_settings import DcaPlotterSettings
+from dca_plotter.desk_feedback import DeskFeedback
 from dca_plotter.mapper.dialog import DcaMappingDialog
 from dca_plotter.mapper.model import DcaMappingModel
 from dca_plotter.roles.roles_switcher import RolesSwitcher
 from dca_plotter.roles.roles_switcher_model import RolesSwitcherModel
+from dca_plotter.show_compiler import compile_show
+from dca_plotter.tracker.journal import (
+    DeskJournal,
+    prune_journals,
+    recorded_session_file,
+    session_references_journal,
+)
 from dca_plotter.tracker.model import DcaTrackingModel
 from dca_plotter.tracker.view import DcaTrackingView
+from dca_plotter.utilities import get_channel_assignment_name
+
+logger = logging.getLogger(__name__) # pylint: disable=invalid-name
 
 class DcaPlotter(Plugin):
     """Provides the ability to plot DCA/VCA assignments"""
@@ -54,12 +72,30 @@ class DcaPlotter(Plugin):
     Description = 'Provides the ability to plot DCA/VCA assignments'
     CueCategory = QT_TRANSLATE_NOOP("CueCategory", "DCA/VCA Manipulation")
 
+    _choir_members = {}
+    _choir_member_sets = {}
+    _choirs_by_strip = {}
+    _compile_menu_action = None
+    _cue_dispatcher = None
+    _desk_channels = {}
+    _desk_feedback = None
+    _desk_status_menu_action = None
+    _journalled_file = ''
+    _load_state_menu_action = None
     _mapping_menu_action = None
     _mapping_dialog = None
     _mapping_model = None
+    _pending_moves = []
+    _pending_removals = []
+    _reorder_timer = None
+    _resend_menu_action = None
     _roles_menu_action = None
     _roles_switcher_dialog = None
     _roles_switcher_model = None
+    _step_back_menu_action = None
+    _strips_by_desk_channel = {}
+    _substitute_menu_action = None
+    _substitutions = {}
     _tracking_model = None
     _tracker_view = None
 
@@ -75,6 +111,9 @@ class DcaPlotter(Plugin):
             'plugins.dca_plotter', DcaPlotterSettings, DcaPlotter.Config)
         DcaPlotter.Config.updated.connect(self._on_config_update)
 
+        # The patching of the desks' MIDI ports is managed by MidiFixtureControl
+        get_plugin('MidiFixtureControl').Config.updated.connect(self._on_fixture_config_update)
+
         # Register the session-level configuration of inputs
         SessionConfigurationDialog.registerSettingsPage(
             'channel_assign', ChannelAssignConfig, self)
@@ -90,6 +129,31 @@ class DcaPlotter(Plugin):
         self._roles_menu_action.triggered.connect(self._open_switcher_dialog)
         self.app.window.menuTools.addAction(self._roles_menu_action)
 
+        self._step_back_menu_action = QAction(translate('dca_plotter', 'Step Back DCA State'),
+                                              self.app.window)
+        self._step_back_menu_action.triggered.connect(self._step_back)
+        self.app.window.menuTools.addAction(self._step_back_menu_action)
+
+        self._compile_menu_action = QAction(translate('dca_plotter', 'Compile DCA MIDI to File...'),
+                                            self.app.window)
+        self._compile_menu_action.triggered.connect(self._compile_show)
+        self.app.window.menuTools.addAction(self._compile_menu_action)
+
+        self._substitute_menu_action = QAction(translate('dca_plotter', 'Substitute Input...'),
+                                               self.app.window)
+        self._substitute_menu_action.triggered.connect(self._substitute_input)
+        self.app.window.menuTools.addAction(self._substitute_menu_action)
+
+        self._desk_status_menu_action = QAction(translate('dca_plotter', 'DCA Desk Status...'),
+                                                self.app.window)
+        self._desk_status_menu_action.triggered.connect(self._show_desk_status)
+        self.app.window.menuTools.addAction(self._desk_status_menu_action)
+
+        self._resend_menu_action = QAction(translate('dca_plotter', 'Resend Outstanding DCA Changes'),
+                                           self.app.window)
+        self._resend_menu_action.triggered.connect(self._resend_outstanding)
+        self.app.window.menuTools.addAction(self._resend_menu_action)
+
     def _open_mapper_dialog(self):
         if not self.mapper_enabled():
             return
@@ -97,15 +161,140 @@ class DcaPlotter(Plugin):
             self._mapping_dialog = DcaMappingDialog(self._mapping_model)
         self._mapping_dialog.open()
 
+    def _compile_show(self):
+        if not self._tracking_model:
+            return
+
+        filename, _ = QFileDialog.getSaveFileName(
+            self.app.window,
+            translate('dca_plotter', 'Compile DCA MIDI to File'),
+            filter='JSON Lines (*.jsonl)')
+        if not filename:
+            return
+
+        with open(filename, 'w', encoding='utf-8') as output_file:
+            totals = self.compile_midi(output_file)
+
+        logger.info(
+            'Compiled %d cues to %d MIDI messages (%d bytes, %.2f seconds on the wire)',
+            totals['cues'], totals['messages'], totals['bytes'], totals['wire_time'])
+
+    def compile_midi(self, output_file):
+        """Compiles the MIDI the session's cues would transmit when run in order, from the top.
+
+        See `show_compiler.compile_show()`.
+        """
+        cues = sorted([cue for cue in self.app.cue_model if self._is_supported_cuetype(cue.type)],
+                      key=lambda cue: cue.index)
+        return compile_show(cues, output_file, self.mapper_enabled())
+
+    def _load_selected_cue_state(self):
+        current = self.app.layout.view.listView.currentItem()
+        if current and self._is_supported_cuetype(current.cue.type):
+            self._tracking_model.load_cue_state(current.cue)
+
+    def _listen_for_desk_feedback(self):
+        if self._desk_feedback:
+            self._desk_feedback.close()
+            self._desk_feedback = None
+
+        port_name = DcaPlotter.Config.get('desk_feedback_port', '')
+        fixture_control = get_plugin('MidiFixtureControl')
+        dca_device = fixture_control.SessionConfig['dca_device']
+        if not port_name or not dca_device or not self._tracking_model:
+            return
+
+        self._desk_feedback = DeskFeedback(self._tracking_model,
+                                           fixture_control.get_profile(dca_device))
+        self._desk_feedback.listen(port_name)
+
     def _open_switcher_dialog(self):
         if not self._roles_switcher_dialog:
             self._roles_switcher_dialog = RolesSwitcher(self._roles_switcher_model)
         self._roles_switcher_dialog.open()
 
+    def _substitute_input(self):
+        if not self._tracking_model:
+            return
+
+        inputs = self.assignables(['input'])
+        names = [get_channel_assignment_name(channel_tuple) for channel_tuple in inputs]
+        if not names:
+            return
+
+        failed, accepted = QInputDialog.getItem(
+            self.app.window,
+            translate('dca_plotter', 'Substitute Input'),
+            translate('dca_plotter', 'Input to replace:'),
+            names, editable=False)
+        if not accepted:
+            return
+        failed = inputs[names.index(failed)]
+
+        current = self._substitutions.get(failed, failed)
+        substitute, accepted = QInputDialog.getItem(
+            self.app.window,
+            translate('dca_plotter', 'Substitute Input'),
+            translate('dca_plotter', 'Replace with (choose the same input to undo):'),
+            names, inputs.index(current), editable=False)
+        if not accepted:
+            return
+
+        self._tracking_model.substitute_strip(failed, inputs[names.index(substitute)])
+
+    def _resend_outstanding(self):
+        if self._tracking_model:
+            self._tracking_model.resend_outstanding()
+
+    def _show_desk_status(self):
+        if not self._tracking_model:
+            return
+
+        status = self._tracking_model.output_status()
+        lines = [translate('dca_plotter', 'Main device {device}: {health}, {failures} failures')
+                 .format_map(dict(status, device=status['device'] or '-'))]
+        if status['last_error']:
+            lines.append(translate('dca_plotter', '    Last error: {0}').format(
+                status['last_error']))
+        lines.append(translate('dca_plotter', '    Changes not yet delivered: {0}').format(
+            len(self._tracking_model.dead_letters())))
+        for status in self._tracking_model.mirror_status():
+            lines.append(translate(
+                'dca_plotter',
+                'Mirror {device}: {health}, {transmitted} of {submitted} sent ({queued} queued), '
+                '{messages} messages, {failures} failures').format_map(status))
+            if status['last_error']:
+                lines.append(translate('dca_plotter', '    Last error: {0}').format(
+                    status['last_error']))
+
+        QMessageBox.information(self.app.window,
+                                translate('dca_plotter', 'DCA Desk Status'),
+                                '\n'.join(lines))
+
+    def _step_back(self):
+        if self._tracking_model:
+            self._tracking_model.step_back()
+
     def _pre_session_deinitialisation(self, _):
         '''Called when session is being de-init'd.'''
         layout = self.app.layout
-        self._roles_switcher_model.roleUpdated.disconnect(self._tracking_model.role_assign_swap)
+        self._roles_switcher_model.rolesUpdated.disconnect(self._tracking_model.role_assign_swaps)
+        # A clean close: what the desk is left with mustn't be "recovered" next time
+        self.app.session.property_changed.disconnect(self._on_session_property_changed)
+        self._tracking_model.close_journal(discard=True)
+        self._journalled_file = ''
+        self._tracking_model.mirror_to([])
+        if self._desk_feedback:
+            self._desk_feedback.close()
+            self._desk_feedback = None
+        if self._cue_dispatcher:
+            self._cue_dispatcher.close()
+            self._cue_dispatcher = None
+        if self._reorder_timer:
+            self._reorder_timer.stop()
+            self._reorder_timer = None
+        self._pending_moves = []
+        self._pending_removals = []
         if isinstance(layout, ListLayout):
             layout.model.item_added.disconnect(self._on_cue_added)
             layout.model.item_moved.disconnect(self._on_cue_moved)
@@ -127,21 +316,38 @@ class DcaPlotter(Plugin):
         been restored (in the case of loading from file).
         """
         layout = self.app.layout
+        self._rebuild_choir_index()
+        self._substitutions = {}
+        self._rebuild_desk_channels()
 
         # Create the session's dca-tracking model
         # This model does not contain cues.
         # Instead it tracks which mics are muted and are currently assigned where
         self._tracking_model = DcaTrackingModel(self.mapper_enabled())
 
+        # Recover what was last sent to the desk (in case we've been restarted mid-show).
+        # Only saved shows are journalled, each to its own journal so that opening one doesn't
+        # recover another's state. A show not yet saved gets its journal when it is.
+        prune_journals(self._journals_folder(), keep=(self.SessionConfig.get('journal_id'),))
+        self._journalled_file = ''
+        self._start_journal()
+        self.app.session.property_changed.connect(self._on_session_property_changed)
+
+        self._listen_for_desk_feedback()
+        self._tracking_model.mirror_to(self.SessionConfig.get('mirror_dca_devices', []))
+
         # Renew the options in the Role Switcher
         self._roles_switcher_model.renew(self.SessionConfig)
-        self._roles_switcher_model.roleUpdated.connect(self._tracking_model.role_assign_swap)
+        self._roles_switcher_model.rolesUpdated.connect(self._tracking_model.role_assign_swaps)
 
         # If the mapper is not to be used we don't need to have it or its menu option in existence
         if not self.mapper_enabled():
             if self._mapping_menu_action:
                 self.app.window.menuTools.removeAction(self._mapping_menu_action)
+            if self._load_state_menu_action:
+                self.app.window.menuTools.removeAction(self._load_state_menu_action)
             self._mapping_menu_action = None
+            self._load_state_menu_action = None
             self._mapping_model = None
             if self._mapping_dialog:
                 self._mapping_dialog.close()
@@ -156,6 +362,15 @@ class DcaPlotter(Plugin):
         # This model *does* contain cues - or references to them - and with the
         # aid of the listeners below gets updated when certain cues are updated.
         self._mapping_model = DcaMappingModel()
+        self._cue_dispatcher = CuePropertyDispatcher()
+
+        # The ListLayout moves and removes cues one at a time, even when several are selected:
+        # we wait until it's done, then bring the mapper into line with them all at once.
+        self._pending_moves = []
+        self._pending_removals = []
+        self._reorder_timer = QTimer()
+        self._reorder_timer.setSingleShot(True)
+        self._reorder_timer.timeout.connect(self._apply_pending_reorder)
         if self._mapping_dialog:
             self._mapping_dialog.setModel(self._mapping_model)
 
@@ -165,6 +380,12 @@ class DcaPlotter(Plugin):
             self._mapping_menu_action.triggered.connect(self._open_mapper_dialog)
             self.app.window.menuTools.addAction(self._mapping_menu_action)
 
+        if not self._load_state_menu_action:
+            self._load_state_menu_action = QAction(
+                translate('dca_plotter', 'Load DCA State at Selected Cue'), self.app.window)
+            self._load_state_menu_action.triggered.connect(self._load_selected_cue_state)
+            self.app.window.menuTools.addAction(self._load_state_menu_action)
+
         # Listeners for cue actions
         layout.model.item_added.connect(self._on_cue_added)
         layout.model.item_moved.connect(self._on_cue_moved)
@@ -173,14 +394,68 @@ class DcaPlotter(Plugin):
 
         self.initialised.emit()
 
+    def _on_session_property_changed(self, _, name, value):
+        if name != 'session_file' or not value or value == self._journalled_file:
+            return
+
+        if self._journalled_file:
+            # Saved as a copy: the copy is the show now open, and needs a journal of its own
+            # (leaving the original's for the original). As the original is no longer open,
+            # nothing is left to recover from its journal.
+            self._tracking_model.close_journal(discard=True)
+            self.SessionConfig['journal_id'] = ''
+        self._start_journal()
+
+    def _journals_folder(self):
+        return os.path.join(app_dirs.user_data_dir, 'dca_plotter', 'journals')
+
+    def _start_journal(self):
+        session_file = self.app.session.session_file
+        if not session_file:
+            return
+
+        journal_id = self.SessionConfig.get('journal_id')
+        if journal_id:
+            # A show copied outside of LiSP shares its original's id: if the journal belongs to
+            # another show that's still saved, this one needs an id of its own.
+            journal_path = os.path.join(self._journals_folder(), journal_id + '.jsonl')
+            owner = recorded_session_file(journal_path)
+            if owner and os.path.abspath(owner) != os.path.abspath(session_file) \
+               and session_references_journal(owner, journal_id):
+                journal_id = None
+
+        if not journal_id:
+            journal_id = uuid.uuid4().hex
+            self.SessionConfig['journal_id'] = journal_id
+
+        self._journalled_file = session_file
+        self._tracking_model.use_journal(DeskJournal(
+            os.path.join(self._journals_folder(), journal_id + '.jsonl'), session_file))
+
     def _on_config_update(self, args):
         if 'blanking_text' in args:
-            self._tracking_model.regenerate_current()
+            self._tracking_model.refreshStateHashes()
+            if self._mapping_model:
+                self._mapping_model.refreshStateHashes()
+        if 'blanking_text' in args or 'prearm_silent_changes' in args:
+            self._tracking_model.schedule_regeneration()
+        if 'desk_feedback_port' in args:
+            self._listen_for_desk_feedback()
+
+    def _on_fixture_config_update(self, _):
+        if self._tracking_model:
+            self._tracking_model.invalidate_output()
 
     def _on_session_config_altered(self, _):
+        self._rebuild_choir_index()
+        self._rebuild_desk_channels()
+        self._listen_for_desk_feedback()
+        self._tracking_model.invalidate_output()
+        self._tracking_model.mirror_to(self.SessionConfig.get('mirror_dca_devices', []))
+
         # Renew the options in the Role Switcher
         self._roles_switcher_model.renew(self.SessionConfig)
-        self._tracking_model.regenerate_current()
+        self._tracking_model.schedule_regeneration()
 
     def _on_cue_selected(self, current, _):
         """Action to take when a cue is selected.
@@ -190,6 +465,7 @@ class DcaPlotter(Plugin):
         (And there are no other layouts currently.)
         """
         if current and self._mapping_model:
+            self._apply_pending_reorder()
             if self._is_supported_cuetype(current.cue.type):
                 self._tracking_model.select_cue(current.cue)
             else:
@@ -198,20 +474,45 @@ class DcaPlotter(Plugin):
     def _on_cue_added(self, cue):
         """Action to take when a cue is added to the List Layout."""
         if self._is_supported_cuetype(cue.type):
+            # The new cue-row is added at the end, so the others need to be in order first
+            self._apply_pending_reorder()
             self._mapping_model.append_cuerow(cue)
-            cue.property_changed.connect(self._tracking_model.on_cue_update)
+            self._cue_dispatcher.watch(cue)
 
     def _on_cue_moved(self, _, new_index):
         """Action to take when a cue is moved in the List Layout."""
         cue = self.app.layout.model.item(new_index)
-        if self._is_supported_cuetype(cue.type):
-            self._mapping_model.move_cuerow(cue, new_index)
+        if self._is_supported_cuetype(cue.type) and cue not in self._pending_moves:
+            self._pending_moves.append(cue)
+            self._reorder_timer.start()
 
     def _on_cue_removed(self, cue):
         """Action to take when a cue is removed from the List Layout."""
         if self._is_supported_cuetype(cue.type):
-            self._mapping_model.remove_cuerow(cue)
-            cue.property_changed.disconnect(self._tracking_model.on_cue_update)
+            self._cue_dispatcher.unwatch(cue)
+            if cue in self._pending_moves:
+                self._pending_moves.remove(cue)
+            self._pending_removals.append(cue)
+            self._reorder_timer.start()
+
+    def _apply_pending_reorder(self):
+        """Brings the mapper into line with the cues moved and removed since it was last."""
+        if not self._pending_moves and not self._pending_removals:
+            return
+
+        self._reorder_timer.stop()
+        if len(self._pending_moves) + len(self._pending_removals) > 1:
+            with self._mapping_model.transaction():
+                self._mapping_model.remove_cuerows(self._pending_removals)
+                self._mapping_model.move_cuerows(self._pending_moves)
+        else:
+            # Just the one cue, so it's moved (or removed) as it would be on its own
+            self._mapping_model.remove_cuerows(self._pending_removals)
+            self._mapping_model.move_cuerows(self._pending_moves)
+
+        # Only forgotten once applied, so they're tried again should something go wrong
+        self._pending_moves = []
+        self._pending_removals = []
 
     def assignables(self, types):
         """
@@ -240,6 +541,13 @@ class DcaPlotter(Plugin):
     def mapper(self):
         return self._mapping_model
 
+    def resolve_strip(self, desk_channel):
+        """Returns the strip that is sent to a desk channel: the reverse of resolve_desk_channel
+
+        Returns None for a desk channel that no strip is patched (or substituted) to.
+        """
+        return self._strips_by_desk_channel.get(desk_channel)
+
     def resolve_role(self, role_id):
         current = self._roles_switcher_model.current(role_id)
         if current:
@@ -251,8 +559,83 @@ class DcaPlotter(Plugin):
         return None
 
     def resolve_choir(self, choir_id):
-        choir_assigns = self.SessionConfig['assigns']['choir'][choir_id]['assigns']
-        return [tuple(assign) for assign in choir_assigns]
+        return self._choir_members[choir_id]
+
+    def choirs_containing(self, channel_tuple):
+        """Returns the ids of the choir groupings the given strip is a member of."""
+        return self._choirs_by_strip.get(channel_tuple, frozenset())
+
+    def is_choir_member(self, choir_id, channel_tuple):
+        return channel_tuple in self._choir_member_sets[choir_id]
+
+    def _rebuild_choir_index(self):
+        """Expands the choir groupings of the session config, ready for (repeated) use.
+
+        Called whenever the session config changes.
+        """
+        choir_members = {}
+        choirs_by_strip = {}
+        for choir_id, choir in self.SessionConfig['assigns']['choir'].items():
+            choir_members[choir_id] = tuple(tuple(assign) for assign in choir['assigns'])
+            for assign in choir_members[choir_id]:
+                choirs_by_strip.setdefault(assign, set()).add(choir_id)
+
+        self._choir_members = choir_members
+        self._choir_member_sets = {
+            choir_id: frozenset(members) for choir_id, members in choir_members.items()
+        }
+        self._choirs_by_strip = {
+            assign: frozenset(choir_ids) for assign, choir_ids in choirs_by_strip.items()
+        }
+
+    def resolve_desk_channel(self, channel_tuple):
+        """Returns the desk channel - as a (type, number) tuple - that a strip is to be sent to.
+
+        This takes into account both the session's assignments (e.g. Microphone 2 being
+        actually Desk Channel 7) and any substitutions currently in place.
+        """
+        return self._desk_channels.get(channel_tuple, channel_tuple)
+
+    def substitute(self, channel_tuple, substitute):
+        """Has one strip stand in for another on the desk, until undone or the session ends.
+
+        Substituting a strip with itself removes any substitution of it.
+        """
+        if substitute == channel_tuple:
+            self._substitutions.pop(channel_tuple, None)
+        else:
+            self._substitutions[channel_tuple] = substitute
+        self._rebuild_desk_channels()
+
+    def substitutes(self):
+        """Returns the strips currently being stood in for, and what is standing in for them."""
+        return dict(self._substitutions)
+
+    def _rebuild_desk_channels(self):
+        """Works out which desk channel each strip is sent to, ready for (repeated) use.
+
+        Called whenever the session config or the substitutions change.
+        """
+        patched = {}
+        for strip_type in ('input', 'fx'):
+            for num, assign in enumerate(self.SessionConfig['assigns'][strip_type]):
+                patched[(strip_type, num + 1)] = (strip_type, assign['in'])
+
+        desk_channels = dict(patched)
+        for original, current in self._substitutions.items():
+            desk_channels[original] = patched.get(current, current)
+
+        # A strip being stood in for keeps its own desk channel (which may still report it
+        # being released), and its substitute's desk channel is reported as it too
+        strips_by_desk_channel = {
+            desk_channel: strip for strip, desk_channel in patched.items()
+        }
+        strips_by_desk_channel.update({
+            desk_channels[original]: original for original in self._substitutions
+        })
+
+        self._desk_channels = desk_channels
+        self._strips_by_desk_channel = strips_by_desk_channel
 
     def tracker(self):
         return self._tracking_model
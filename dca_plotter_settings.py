@@ -23,9 +23,19 @@
 # pylint: disable=missing-docstring, invalid-name
 
 # pylint: disable=no-name-in-module
-from PyQt5.QtWidgets import QVBoxLayout, QFormLayout, QLineEdit, QSpinBox, QGroupBox
+from PyQt5.QtWidgets import (
+    QCheckBox,
+    QComboBox,
+    QVBoxLayout,
+    QFormLayout,
+    QLineEdit,
+    QSpinBox,
+    QGroupBox,
+)
 
 # pylint: disable=import-error
+import mido
+
 from lisp.ui.settings.pages import SettingsPage
 
 class DcaPlotterSettings(SettingsPage):
@@ -51,14 +61,35 @@ class DcaPlotterSettings(SettingsPage):
         self.blankingText = QLineEdit(self)
         self.settingsGroup.layout().addRow('Set name of empty DCAs to', self.blankingText)
 
+        self.prearmCheckbox = QCheckBox(self)
+        self.prearmCheckbox.setToolTip(
+            'When a cue is selected, send its renames and the assigns of muted channels\n'
+            'straight away, so that only the (un)mutes are left to send when it is called.'
+        )
+        self.settingsGroup.layout().addRow('Pre-send inaudible changes', self.prearmCheckbox)
+
+        self.feedbackPort = QComboBox(self)
+        self.feedbackPort.setEditable(True)
+        self.feedbackPort.addItem('')
+        self.feedbackPort.addItems(mido.get_input_names())
+        self.feedbackPort.setToolTip(
+            'The MIDI input the DCA desk echoes its changes to, so that changes made on the\n'
+            'desk by hand are kept track of. Leave empty to not listen for any.'
+        )
+        self.settingsGroup.layout().addRow('Listen for desk feedback on', self.feedbackPort)
+
     def getSettings(self):
         return {
             'input_channel_count': self.inputCount.value(),
             'fx_channel_count': self.fxCount.value(),
             'blanking_text': self.blankingText.text(),
+            'prearm_silent_changes': self.prearmCheckbox.isChecked(),
+            'desk_feedback_port': self.feedbackPort.currentText(),
         }
 
     def loadSettings(self, settings):
         self.inputCount.setValue(settings['input_channel_count'])
         self.fxCount.setValue(settings['fx_channel_count'])
         self.blankingText.setText(settings['blanking_text'])
+        self.prearmCheckbox.setChecked(settings['prearm_silent_changes'])
+        self.feedbackPort.setCurrentText(settings['desk_feedback_port'])
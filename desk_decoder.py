@@ -0,0 +1,145 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=missing-docstring
+
+# pylint: disable=import-error
+from lisp.plugins import get_plugin
+from lisp.plugins.midi.midi_utils import midi_from_dict
+
+from .tracker.model import channel_type_variants
+
+# Used to find where in a message a DCA's name goes
+NAME_PROBE = 'X' * 32
+
+class DeskMessageDecoder:
+    '''Recognises the MIDI a desk's profile builds, turning it back into commands
+
+    The profiles only know how to build messages, so instead we build every assign and mute
+    message that could be sent with the session's configuration and look the received
+    messages up. DCA names are recognised by comparing the messages built for an empty and a
+    long name, which gives the bytes either side of where a name goes.
+    '''
+    def __init__(self, profile):
+        self._profile = profile
+        self._sequences = {}
+        self._prefixes = set()
+        self._name_templates = []
+        self._pending = []
+        self._build_tables()
+
+    def decode(self, message):
+        '''Feeds a received message to the decoder
+
+        Returns a list of the (command, args) that have now been completely received.
+        '''
+        message_bytes = tuple(message.bytes())
+
+        name_command = self._decode_name(message_bytes)
+        if name_command:
+            self._pending = []
+            return [name_command]
+
+        self._pending.append(message_bytes)
+        decoded = []
+        while self._pending:
+            sequence = tuple(self._pending)
+            if sequence in self._sequences:
+                command, args = self._sequences[sequence]
+                decoded.append((command, dict(args)))
+                self._pending = []
+            elif sequence in self._prefixes:
+                break
+            else:
+                # Not something we recognise: discard until we're back in step.
+                self._pending.pop(0)
+        return decoded
+
+    def _add_sequence(self, command, args):
+        sequence = self._build(command, args)
+        if not sequence:
+            return
+        self._sequences[sequence] = (command, args)
+        for length in range(1, len(sequence)):
+            self._prefixes.add(sequence[:length])
+
+    def _build(self, command, args):
+        return tuple(tuple(midi_from_dict(dict_msg).bytes())
+                     for dict_msg in self._profile.build_command(command, args))
+
+    def _build_tables(self):
+        session_config = get_plugin('DcaPlotter').SessionConfig
+        channel_types = channel_type_variants(self._profile)
+        dca_range = range(1, session_config['dca_count'] + 1)
+
+        for strip_type in ('input', 'fx'):
+            for strip_assign in session_config['assigns'][strip_type]:
+                channel = {
+                    'channelType': channel_types[strip_type],
+                    'channelNum': strip_assign['in'],
+                }
+                for action in ('mute', 'unmute'):
+                    self._add_sequence('mute', dict(channel, muteAction=action))
+                for dca_num in dca_range:
+                    for action in ('assign', 'unassign'):
+                        self._add_sequence('assignToDca',
+                                           dict(channel, assignAction=action, dcaNum=dca_num))
+
+        for dca_num in dca_range:
+            channel = {
+                'channelType': 'dca',
+                'channelNum': dca_num,
+            }
+            empty = self._build('setName', dict(channel, asciiString=''))
+            probe = self._build('setName', dict(channel, asciiString=NAME_PROBE))
+
+            # Names sent as more than one message aren't (yet) recognised
+            if len(empty) != 1 or len(probe) != 1:
+                continue
+            empty = empty[0]
+            probe = probe[0]
+
+            prefix_len = 0
+            while prefix_len < min(len(empty), len(probe)) \
+                  and empty[prefix_len] == probe[prefix_len]:
+                prefix_len += 1
+
+            suffix_len = 0
+            while suffix_len < min(len(empty), len(probe)) - prefix_len \
+                  and empty[-1 - suffix_len] == probe[-1 - suffix_len]:
+                suffix_len += 1
+
+            self._name_templates.append((empty[:prefix_len],
+                                         empty[len(empty) - suffix_len:],
+                                         channel))
+
+    def _decode_name(self, message_bytes):
+        for prefix, suffix, channel in self._name_templates:
+            if len(message_bytes) < len(prefix) + len(suffix) \
+               or message_bytes[:len(prefix)] != prefix \
+               or message_bytes[len(message_bytes) - len(suffix):] != suffix:
+                continue
+
+            name_bytes = message_bytes[len(prefix):len(message_bytes) - len(suffix)]
+            name = bytes(name_bytes).decode('ascii', errors='replace').strip('\x00 ')
+            return ('setName', dict(channel, asciiString=name))
+        return None
@@ -0,0 +1,97 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=missing-docstring
+
+import logging
+
+# pylint: disable=import-error
+import mido
+
+from lisp.core.signal import Connection, Signal
+from lisp.plugins import get_plugin
+
+from .desk_decoder import DeskMessageDecoder
+from .tracker.model import channel_type_variants
+
+logger = logging.getLogger(__name__) # pylint: disable=invalid-name
+
+class DeskFeedback:
+    '''Listens to what the desk reports back, keeping the tracker in step with it
+
+    Desks echo changes made on them (by hand as well as by us) as the same messages they
+    accept. These are decoded through the desk's profile, turned back into the strips they
+    are about, and handed to the tracker to reconcile. Reports about desk channels that no
+    strip is patched to are of nothing we track, so are ignored.
+
+    Messages can come from a MIDI input port - see ``listen()`` - or be passed straight to
+    ``receive()`` (for instance by a VirtualDesk's ``echo``). Whichever thread they arrive
+    on, they're decoded there and reconciled on the Qt thread.
+    '''
+    def __init__(self, tracker, profile):
+        self._tracker = tracker
+        self._decoder = DeskMessageDecoder(profile)
+        self._port = None
+
+        self._decoded = Signal()
+        self._decoded.connect(self._reconcile, Connection.QtQueued)
+
+        # What the profile calls each of our types of strip, and vice versa
+        self._strip_types = {
+            desk_type: strip_type
+            for strip_type, desk_type in channel_type_variants(profile).items()
+        }
+
+    def close(self):
+        if self._port:
+            self._port.close()
+            self._port = None
+
+    def listen(self, port_name):
+        '''Starts receiving from the named MIDI input port
+
+        Returns whether the port could be opened.
+        '''
+        self.close()
+        try:
+            self._port = mido.open_input(port_name, callback=self.receive)
+        except (IOError, OSError) as exception:
+            logger.warning('Unable to listen for desk feedback on "%s": %s', port_name, exception)
+            return False
+        return True
+
+    def receive(self, message):
+        for command, args in self._decoder.decode(message):
+            self._decoded.emit(command, args)
+
+    def _reconcile(self, command, args):
+        strip_type = self._strip_types.get(args['channelType'], args['channelType'])
+        if strip_type == 'dca':
+            channel_tuple = ('dca', args['channelNum'])
+        else:
+            channel_tuple = get_plugin('DcaPlotter').resolve_strip(
+                (strip_type, args['channelNum']))
+            if channel_tuple is None:
+                logger.debug('Ignoring desk feedback about unpatched channel %s %s.',
+                             strip_type, args['channelNum'])
+                return
+        self._tracker.reconcile_desk_command(command, args, channel_tuple)
@@ -22,6 +22,7 @@
 
 # pylint: disable=missing-docstring
 
+from contextlib import contextmanager
 import copy
 
 # pylint: disable=no-name-in-module
@@ -33,13 +34,111 @@ from lisp.plugins import get_plugin
 # pylint: disable=relative-beyond-top-level
 from ..model_primitives import AssignStateEnum, DcaModelTemplate, ModelsAssignRow, \
     ModelsEntry, ModelsResetRow
+from ..utilities import get_name_for_empty_dca
 
 
 class DcaMappingModel(DcaModelTemplate):
 
+    def __init__(self):
+        super().__init__()
+        self._cuerows_by_id = {}
+        self._transaction_depth = 0
+        self._dirty_cuerows = []
+        self._needs_sort = False
+
+    @contextmanager
+    def transaction(self):
+        '''Defers bringing later cue-rows (and their cues' validity) up to date until the end
+
+        For when several cues are to be edited at once: instead of each edit cascading through
+        the cue-rows beyond it, the affected cue-rows are noted, and once all edits are done the
+        rows are brought up to date in a single pass from the earliest of them. Views are told
+        of it all as one change (a model reset) - so an edit to a single cue shouldn't be made
+        in one, as views would then have to lay out every cue-row again.
+
+        Transactions may be nested; only the outermost one brings the model up to date.
+        '''
+        self._transaction_depth += 1
+        if self._transaction_depth == 1:
+            self.beginResetModel()
+            self._resetting = True
+        try:
+            yield self
+        finally:
+            self._transaction_depth -= 1
+            if not self._transaction_depth:
+                try:
+                    self._recalculate_dirty()
+                finally:
+                    self._resetting = False
+                    self.endResetModel()
+
+    def _mark_dirty(self, cuerow):
+        if cuerow and cuerow not in self._dirty_cuerows:
+            self._dirty_cuerows.append(cuerow)
+
+    def _recalculate_dirty(self):
+        '''Re-derives what the cue-rows inherit, from the earliest one that has been affected'''
+        # Cue-rows moved during the transaction are put in order all at once
+        if self._needs_sort:
+            self._needs_sort = False
+            self.root.children.sort(key=ModelsResetRow.value)
+
+        dirty = self._dirty_cuerows
+        self._dirty_cuerows = []
+        if not dirty:
+            return
+
+        dirty_rownums = sorted(cuerow.rownum() for cuerow in dirty)
+        dirty_rownums = [rownum for rownum in dirty_rownums if rownum != -1]
+        if not dirty_rownums:
+            return
+
+        remaining = len(dirty_rownums)
+        changed = False
+        rownum = dirty_rownums[0]
+        prev_sibling = self.root.child(rownum - 1) if rownum else None
+        for cuerow in self.root.children[rownum:]:
+            is_dirty = cuerow in dirty
+            if is_dirty:
+                remaining -= 1
+            elif not changed and not remaining:
+                break
+
+            if is_dirty or changed:
+                changed = self._reinherit(cuerow, prev_sibling) or is_dirty
+            prev_sibling = cuerow
+
+        get_plugin('DcaPlotter').tracker().schedule_regeneration()
+
+    def _reinherit(self, cuerow, prev_sibling):
+        '''Re-derives what a cue-row inherits from the one before it
+
+        Returns whether what the cue-row passes on to the one after has changed.
+        '''
+        if cuerow.cue.type == "DcaResetCue":
+            return False
+
+        before = cuerow.stateHash()
+
+        # Strip the cue-row back to what its cue defines...
+        for dca_node in cuerow.children:
+            dca_node.setInherited(get_name_for_empty_dca())
+            for entry in copy.copy(dca_node.children):
+                entry.setInherited(False)
+                if entry.assignState() == AssignStateEnum.NONE:
+                    self._remove_node(entry.index())
+
+        # ...and re-apply what it inherits
+        if prev_sibling:
+            self._change_tuples_apply(cuerow, _change_tuples_derive(prev_sibling))
+
+        cuerow.cue.validate_assigns(_change_tuples_derive(cuerow))
+        return cuerow.stateHash() != before
+
     def amend_cuerow(self, cue, property_name, property_value):
         if property_name == 'force_clear':
-            get_plugin('DcaPlotter').tracker().regenerate_current()
+            get_plugin('DcaPlotter').tracker().schedule_regeneration()
             return
 
         if property_name not in ('dca_changes'):
@@ -48,6 +147,12 @@ class DcaMappingModel(DcaModelTemplate):
         cuerow = self.find_cuerow(cue.id)
         changes = []
 
+        if self._transaction_depth:
+            if cue.type != "DcaResetCue":
+                self._set_initial_assigns(cuerow, property_value, True)
+            self._mark_dirty(cuerow)
+            return
+
         if cue.type == "DcaResetCue":
             pass
         else:
@@ -67,7 +172,7 @@ class DcaMappingModel(DcaModelTemplate):
         # Update the cuerows beyond it.
         self._change_tuples_cascade_apply(cuerow, changes)
 
-        get_plugin('DcaPlotter').tracker().regenerate_current()
+        get_plugin('DcaPlotter').tracker().schedule_regeneration()
 
     def append_cuerow(self, cue):
         '''Append a cue-row to the model
@@ -80,20 +185,28 @@ class DcaMappingModel(DcaModelTemplate):
         if cue.type == "DcaChangeCue":
             new_cuerow = ModelsAssignRow(cue, parent=self.root)
             self._add_node(self.createIndex(self.root.childCount(), 0, self.root), new_cuerow)
+            self._cuerows_by_id[cue.id] = new_cuerow
             self._set_initial_assigns(new_cuerow, cue.dca_changes, False)
-            new_cuerow.cue.validate_assigns(_change_tuples_derive(new_cuerow))
+            if self._transaction_depth:
+                self._mark_dirty(new_cuerow)
+            else:
+                new_cuerow.cue.validate_assigns(_change_tuples_derive(new_cuerow))
 
         elif cue.type == "DcaResetCue":
             new_cuerow = ModelsResetRow(cue, parent=self.root)
             self._add_node(self.createIndex(self.root.childCount(), 0, self.root), new_cuerow)
-
-        # Attach listener so we get cue property changes
-        cue.property_changed.connect(self.amend_cuerow)
+            self._cuerows_by_id[cue.id] = new_cuerow
+            if self._transaction_depth:
+                self._mark_dirty(new_cuerow)
 
     def move_cuerow(self, cue, new_cue_index):
         '''Called when a cue is moved in the main cue list'''
         cuerow = self.find_cuerow(cue.id)
 
+        if self._transaction_depth:
+            self._defer_move(cuerow)
+            return
+
         old_index = cuerow.rownum()
         new_index = sorted(self.root.getChildValues()).index(new_cue_index)
 
@@ -143,11 +256,58 @@ class DcaMappingModel(DcaModelTemplate):
             changes = _change_tuples_derive(cuerow)
         self._change_tuples_cascade_apply(cuerow, changes)
 
+    def move_cuerows(self, cues):
+        '''Called when several cues have been moved in the main cue list
+
+        The cue-rows are re-sorted once, and what they inherit re-derived in a single pass from
+        the earliest affected.
+        '''
+        if not cues:
+            return
+        if len(cues) == 1 and not self._transaction_depth:
+            if self.find_cuerow(cues[0].id):
+                self.move_cuerow(cues[0], cues[0].index)
+            return
+
+        with self.transaction():
+            for cue in cues:
+                cuerow = self.find_cuerow(cue.id)
+                if cuerow:
+                    self._defer_move(cuerow)
+
+    def _defer_move(self, cuerow):
+        # Both the cue-row after where it was, and the moved cue-row itself, need re-deriving.
+        # (The cue-rows are still in their order from before the transaction.)
+        self._mark_dirty(cuerow.next_sibling())
+        self._mark_dirty(cuerow)
+        self._needs_sort = True
+
+    def remove_cuerows(self, cues):
+        '''Called when several cues have been removed from the main cue list'''
+        if not cues:
+            return
+        if len(cues) == 1 and not self._transaction_depth:
+            if self.find_cuerow(cues[0].id):
+                self.remove_cuerow(cues[0])
+            return
+
+        with self.transaction():
+            for cue in cues:
+                if self.find_cuerow(cue.id):
+                    self.remove_cuerow(cue)
+
     def remove_cuerow(self, cue):
         '''Removes the cue-row from the model'''
-        cue.property_changed.disconnect(self.amend_cuerow)
         cuerow = self.find_cuerow(cue.id)
 
+        if self._transaction_depth:
+            self._mark_dirty(cuerow.next_sibling())
+            if cuerow in self._dirty_cuerows:
+                self._dirty_cuerows.remove(cuerow)
+            self._remove_node(cuerow.index())
+            del self._cuerows_by_id[cue.id]
+            return
+
         # Update assign entries
         if cue.type == "DcaChangeCue":
             changes = _change_tuples_invert(_change_tuples_derive(cuerow))
@@ -157,6 +317,7 @@ class DcaMappingModel(DcaModelTemplate):
 
         # And remove the cuerow from the model
         self._remove_node(cuerow.index())
+        del self._cuerows_by_id[cue.id]
 
     def _change_tuples_apply(self, cuerow, changes):
 
@@ -198,10 +359,7 @@ class DcaMappingModel(DcaModelTemplate):
 
     def find_cuerow(self, cue_id):
         '''Find and return the cue-row that matches the given cue-id'''
-        for cuerow in self.root.children:
-            if cuerow.cue.id == cue_id:
-                return cuerow
-        return None
+        return self._cuerows_by_id.get(cue_id)
 
     def _set_initial_assigns(self, cuerow, cue_defined_assigns, clear_first):
         # Set base add and remove assigns
@@ -23,6 +23,7 @@
 # pylint: disable=missing-docstring, invalid-name
 
 import enum
+import random
 
 # pylint: disable=no-name-in-module
 from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex
@@ -39,6 +40,18 @@ class AssignStateEnum(enum.Enum):
     UNASSIGN = enum.auto()
     NONE = enum.auto()
 
+# Each part of a DCA state - a strip being assigned to a DCA, or a DCA having a name - has a
+# random 64-bit key. The hash of a complete state is the XOR of the keys of its parts, so can be
+# kept up to date by XOR-ing keys in and out as the parts change.
+_zobrist_random = random.Random()
+_zobrist_keys = {}
+
+def zobrist_key(part):
+    key = _zobrist_keys.get(part)
+    if key is None:
+        key = _zobrist_keys.setdefault(part, _zobrist_random.getrandbits(64))
+    return key
+
 ### ABSTRACTS
 class ModelsNode():
     '''Abstract parent class'''
@@ -60,7 +73,7 @@ class ModelsNode():
         return self.parent.model()
 
     def next_sibling(self):
-        if self.rownum() < len(self.parent) - 1:
+        if self.rownum() < len(self.parent.children) - 1:
             return self.parent.children[self.rownum() + 1]
         return None
 
@@ -153,20 +166,39 @@ class ModelsAssignRow(ModelsResetRow):
     '''Assign Row class.'''
     def __init__(self, cue=None, **kwargs):
         super().__init__(cue, **kwargs)
+        self._state_hash = 0
 
         # pylint: disable=unused-variable
         for dca in range(get_plugin('DcaPlotter').SessionConfig['dca_count']):
             self.addChild(ModelsBlock(parent=self))
 
+        for block in self.children:
+            block.refreshNameHash()
+
+    def stateHash(self):
+        '''Returns the hash of the effective DCA state (names and assigns) of this row
+
+        Rows with the same state have the same hash.
+        '''
+        return self._state_hash
+
+    def xorStateHash(self, key):
+        self._state_hash ^= key
+
 class ModelsBlock(ModelsBranchNode):
     '''Block class'''
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._given_name = False
         self._inherited_name = get_name_for_empty_dca()
+        self._name_key = 0
 
     def addChild(self, child):
         self.children.insert(self.getInsertPoint(child.value()), child)
+        child.setHashed(True)
+        self.toggleEntryHash(child)
+        if self.model().hideEmptyDcaNames:
+            self.refreshNameHash()
 
     def data(self, role=Qt.DisplayRole):
         if role in (Qt.DisplayRole, Qt.EditRole):
@@ -202,6 +234,26 @@ class ModelsBlock(ModelsBranchNode):
     def inherited(self):
         return self._given_name is False
 
+    def refreshNameHash(self):
+        '''Brings the row's state hash up to date with this block's (displayed) name'''
+        name_key = zobrist_key(('name', self.rownum(), self.data()))
+        if name_key != self._name_key:
+            self.parent.xorStateHash(self._name_key ^ name_key)
+            self._name_key = name_key
+
+    def removeChild(self, row):
+        child = super().removeChild(row)
+        self.toggleEntryHash(child)
+        child.setHashed(False)
+        if self.model().hideEmptyDcaNames:
+            self.refreshNameHash()
+        return child
+
+    def toggleEntryHash(self, entry):
+        '''XORs an entry in to (or out of) the row's state hash, if it's an assign'''
+        if entry.assignState() != AssignStateEnum.UNASSIGN:
+            self.parent.xorStateHash(zobrist_key(('assign', self.rownum(), entry.value())))
+
     def deserialiseName(self, value):
         self.setData(value, Qt.EditRole)
 
@@ -213,10 +265,12 @@ class ModelsBlock(ModelsBranchNode):
             return False
 
         self._given_name = value if value else False
+        self.refreshNameHash()
         return True
 
     def setInherited(self, value):
         self._inherited_name = value
+        self.refreshNameHash()
 
 
 ### LEAVES
@@ -227,6 +281,7 @@ class ModelsEntry(ModelsLeafNode):
         self._value = value
         self._is_inherited = False
         self._assign_state = state
+        self._hashed = False
 
     def data(self, role=Qt.DisplayRole):
         # pylint: disable=too-many-return-statements
@@ -256,7 +311,16 @@ class ModelsEntry(ModelsLeafNode):
 
     def setAssignState(self, new_state):
         if new_state in AssignStateEnum:
+            if self._hashed:
+                self.parent.toggleEntryHash(self)
             self._assign_state = new_state
+            if self._hashed:
+                self.parent.toggleEntryHash(self)
+                if self.model().hideEmptyDcaNames:
+                    self.parent.refreshNameHash()
+
+    def setHashed(self, hashed):
+        self._hashed = hashed
 
     def setInherited(self, is_inherited):
         self._is_inherited = is_inherited
@@ -269,6 +333,10 @@ class DcaModelTemplate(QAbstractItemModel):
 
     hideEmptyDcaNames = True
 
+    # Set whilst the model is being reset, as views are then told of everything at once (when
+    # the reset ends), rather than of each row as it's added or removed.
+    _resetting = False
+
     def __init__(self):
         super().__init__()
         self.root = ModelsRootNode(model=self)
@@ -276,6 +344,13 @@ class DcaModelTemplate(QAbstractItemModel):
     def __len__(self):
         return self.root.childCount()
 
+    def refreshStateHashes(self):
+        '''Brings the rows' state hashes up to date after what empty DCAs are named changes'''
+        for row in self.root.children:
+            if isinstance(row, ModelsAssignRow):
+                for block in row.children:
+                    block.refreshNameHash()
+
     def childCount(self, index):
         node = index.internalPointer() if index.isValid() else self.root
         return node.childCount()
@@ -331,6 +406,10 @@ class DcaModelTemplate(QAbstractItemModel):
         parent_index = destination
         parent_node = parent_index.internalPointer()
 
+        if self._resetting:
+            parent_node.addChild(new_node)
+            return
+
         rownum = parent_node.getInsertPoint(new_node.value())
         self.beginInsertRows(parent_index, rownum, rownum)
         parent_node.addChild(new_node)
@@ -339,6 +418,11 @@ class DcaModelTemplate(QAbstractItemModel):
     def _clear_node(self, node_index):
         '''Clear a node of all its children'''
         node = node_index.internalPointer()
+        if self._resetting:
+            while node.childCount():
+                node.removeChild(0)
+            return
+
         self.beginRemoveRows(node_index, 0, node.childCount())
         while node.childCount():
             node.removeChild(0)
@@ -369,6 +453,10 @@ class DcaModelTemplate(QAbstractItemModel):
         if not node_index.isValid():
             return
 
+        if self._resetting:
+            node_index.internalPointer().parent.removeChild(node_index.row())
+            return
+
         self.beginRemoveRows(self.parent(node_index), node_index.row(), node_index.row())
         node_index.internalPointer().parent.removeChild(node_index.row())
         self.endRemoveRows()
@@ -176,6 +176,12 @@ class DcaModelViewTemplate(QAbstractItemView):
                     assign_viewoptions.state |= _get_selection_state(assign_index)
                     self.itemDelegate().paint(painter, assign_viewoptions, assign_index)
 
+    def reset(self):
+        '''This slot is called when the model has been reset
+        '''
+        super().reset()
+        self._invalidate_cell_sizes()
+
     def resizeEvent(self, _):
         '''Typically used to update the scrollbars
         @arg event QResizeEvent
@@ -247,6 +253,11 @@ class DcaModelViewTemplate(QAbstractItemView):
         super().setModel(model)
         self._cell_sizes_dirty = True
 
+        # (The view is otherwise only told of these once it next lays itself out)
+        model.layoutChanged.connect(self._invalidate_cell_sizes)
+        model.rowsMoved.connect(self._invalidate_cell_sizes)
+        model.rowsRemoved.connect(self._invalidate_cell_sizes)
+
     def setSelection(self, rect, flags): # REQUIRED
         '''Applies the selection flags to all of the items in or touching the rectangle rect
         @arg rect QRect
@@ -415,6 +426,10 @@ class DcaModelViewTemplate(QAbstractItemView):
         self.viewport().update()
         self.updateGeometries()
 
+    def _invalidate_cell_sizes(self, *_):
+        self._cell_sizes_dirty = True
+        self.viewport().update()
+
     def _paint_outline(self, painter, rect):
         rect = rect.adjusted(0, 0, -1, -1)
         painter.save()
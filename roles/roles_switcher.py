@@ -22,7 +22,15 @@
 
 # pylint: disable=no-name-in-module
 from PyQt5.Qt import QSizePolicy
-from PyQt5.QtWidgets import QDialog, QVBoxLayout
+from PyQt5.QtWidgets import (
+    QComboBox,
+    QDialog,
+    QHBoxLayout,
+    QInputDialog,
+    QPushButton,
+    QVBoxLayout,
+    QWidget,
+)
 
 from lisp.plugins import get_plugin
 from lisp.ui.ui_utils import translate
@@ -42,3 +50,57 @@ class RolesSwitcher(QDialog):
         self._view = RolesSwitcherView(parent=self)
         self._view.setModel(view_model)
         self.layout().addWidget(self._view)
+
+        self._model = view_model
+        self._model.dataRenewed.connect(self._refresh_casts)
+
+        # Cast presets at bottom
+        self.casts_group = QWidget(self)
+        self.casts_group.setLayout(QHBoxLayout())
+        self.layout().addWidget(self.casts_group)
+
+        self.cast_select = QComboBox(self.casts_group)
+        self.casts_group.layout().addWidget(self.cast_select)
+
+        self.button_apply = QPushButton(self.casts_group)
+        self.button_apply.setText(translate('dca_plotter', 'Apply Cast'))
+        self.button_apply.clicked.connect(self._apply_cast)
+        self.casts_group.layout().addWidget(self.button_apply)
+
+        self.button_save = QPushButton(self.casts_group)
+        self.button_save.setText(translate('dca_plotter', 'Save as Cast...'))
+        self.button_save.clicked.connect(self._save_cast)
+        self.casts_group.layout().addWidget(self.button_save)
+
+        self._refresh_casts()
+
+    def _apply_cast(self):
+        casts = get_plugin('DcaPlotter').SessionConfig.get('casts', {})
+        name = self.cast_select.currentText()
+        if name in casts:
+            self._model.apply_cast(casts[name])
+
+    def _refresh_casts(self):
+        casts = get_plugin('DcaPlotter').SessionConfig.get('casts', {})
+        current = self.cast_select.currentText()
+        self.cast_select.clear()
+        self.cast_select.addItems(sorted(casts.keys()))
+        if current in casts:
+            self.cast_select.setCurrentText(current)
+        self.button_apply.setEnabled(bool(casts))
+
+    def _save_cast(self):
+        name, accepted = QInputDialog.getText(self,
+                                              translate('dca_plotter', 'Save as Cast'),
+                                              translate('dca_plotter', 'Cast name:'),
+                                              text=self.cast_select.currentText())
+        if not accepted or not name:
+            return
+
+        session_config = get_plugin('DcaPlotter').SessionConfig
+        casts = dict(session_config.get('casts', {}))
+        casts[name] = self._model.cast()
+        session_config['casts'] = casts
+
+        self._refresh_casts()
+        self.cast_select.setCurrentText(name)
@@ -35,13 +35,43 @@ from ..utilities import get_channel_name
 class RolesSwitcherModel(QAbstractItemModel):
 
     dataRenewed = Signal()
-    roleUpdated = Signal()
+    rolesUpdated = Signal()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._roles = {}
         self._roles_map = []
 
+    def apply_cast(self, cast):
+        '''Sets the current assigns of many Roles at once
+
+        cast: {role_id: assign}; Roles that don't exist, or can't take the given assign, are
+        left as they are.
+        '''
+        swaps = {}
+        for role_id, assign in cast.items():
+            assign = tuple(assign)
+            if role_id not in self._roles or assign not in self._roles[role_id]['assigns']:
+                continue
+            former_current = self._roles[role_id]['current']
+            if assign == former_current:
+                continue
+            self._roles[role_id]['current'] = assign
+            swaps[role_id] = (former_current, assign)
+
+        if not swaps:
+            return
+
+        self.rolesUpdated.emit(swaps)
+        self.dataChanged.emit(
+            self.createIndex(0, 1),
+            self.createIndex(len(self._roles) - 1, max(self._longest_row(), 1)),
+            [Qt.CheckStateRole])
+
+    def cast(self):
+        '''Returns the current assign of every Role, in the form `apply_cast` accepts'''
+        return {role_id: list(role['current']) for role_id, role in self._roles.items()}
+
     def columnCount(self, index):
         # pylint: disable=invalid-name, missing-docstring
         if not index.isValid():
@@ -102,6 +132,11 @@ class RolesSwitcherModel(QAbstractItemModel):
         self._roles_map = list(new_roles.keys())
         self.dataRenewed.emit()
 
+    def _longest_row(self):
+        if not self._roles:
+            return 0
+        return max(len(role['assigns']) for role in self._roles.values())
+
     def flags(self, index):
         # pylint: disable=missing-docstring, no-self-use
         if not index.isValid():
@@ -158,7 +193,8 @@ class RolesSwitcherModel(QAbstractItemModel):
         former_current = self._roles[idx]['current']
         self._roles[idx]['current'] = self._roles[idx]['assigns'][col - 1]
 
-        self.roleUpdated.emit(idx, former_current, self._roles[idx]['current'])
+        if former_current != self._roles[idx]['current']:
+            self.rolesUpdated.emit({idx: (former_current, self._roles[idx]['current'])})
         self.dataChanged.emit(
             self.createIndex(row, 1),
             self.createIndex(row, self.columnCount(index)),
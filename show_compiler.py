@@ -0,0 +1,142 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Compiles the DCA MIDI a show would transmit
+
+As well as through "Tools > Compile DCA MIDI to File", a saved show may be compiled without
+opening Linux Show Player, from an environment where Linux Show Player and its plugins are
+importable (e.g. from within the folder this plugin is installed in):
+
+    python -m dca_plotter.show_compiler show.lsp --output show.jsonl
+'''
+
+# pylint: disable=missing-docstring
+
+import argparse
+import json
+import os
+import sys
+
+from .tracker.model import DcaTrackingModel
+
+# MIDI is transmitted at 31,250 baud, with 10 bits on the wire for every byte
+MIDI_SECONDS_PER_BYTE = 10 / 31250
+
+class _MessageCollector:
+    '''Stands in for the Midi plugin, keeping what would have been sent'''
+    def __init__(self):
+        self.messages = []
+
+    def send(self, _, message):
+        self.messages.append(message)
+
+def compile_show(cues, output_file, use_mapper):
+    '''Compiles the MIDI each cue would transmit when the show is run in order, from the top
+
+    The cues are run through a scratch tracker (so nothing is actually sent), and what each
+    cue would have transmitted is written to `output_file` as a line of JSON.
+
+    Returns the statistics for the show as a whole.
+    '''
+    tracker = DcaTrackingModel(use_mapper)
+    collector = _MessageCollector()
+    tracker.use_midi_output(collector)
+
+    totals = {
+        'cues': 0,
+        'messages': 0,
+        'bytes': 0,
+        'wire_time': 0,
+        'max_wire_time': 0,
+    }
+
+    for cue in cues:
+        collector.messages = []
+        tracker.call_cue(cue)
+
+        messages = [message.hex() for message in collector.messages]
+        byte_count = sum(len(message.bytes()) for message in collector.messages)
+        wire_time = byte_count * MIDI_SECONDS_PER_BYTE
+
+        output_file.write(json.dumps({
+            'index': cue.index,
+            'id': cue.id,
+            'name': cue.name,
+            'messages': messages,
+            'message_count': len(messages),
+            'bytes': byte_count,
+            'wire_time': wire_time,
+        }) + '\n')
+
+        totals['cues'] += 1
+        totals['messages'] += len(messages)
+        totals['bytes'] += byte_count
+        totals['wire_time'] += wire_time
+        totals['max_wire_time'] = max(totals['max_wire_time'], wire_time)
+
+    output_file.write(json.dumps({'totals': totals}) + '\n')
+    return totals
+
+def compile_session_file(session_file, output_file):
+    '''Compiles a saved show, loading it into a hidden instance of Linux Show Player
+
+    The session is loaded as Linux Show Player itself would load it - its plugins included - so
+    the DCA device, and the desk profile, are those the session has been configured with.
+
+    Returns the statistics for the show as a whole.
+    '''
+    # pylint: disable=import-error, import-outside-toplevel, no-name-in-module
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from lisp import DEFAULT_APP_CONFIG, USER_APP_CONFIG, plugins
+    from lisp.application import Application
+    from lisp.core.configuration import JSONFileConfiguration
+    from lisp.plugins import get_plugin
+
+    qt_app = QApplication.instance() or QApplication(sys.argv[:1]) # pylint: disable=unused-variable
+    lisp_app = Application(JSONFileConfiguration(USER_APP_CONFIG, DEFAULT_APP_CONFIG))
+    plugins.load_plugins(lisp_app)
+    try:
+        lisp_app.start(session_file=os.path.abspath(session_file))
+        return get_plugin('DcaPlotter').compile_midi(output_file)
+    finally:
+        plugins.finalize_plugins()
+        lisp_app.finalize()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('session', help='A session file saved by Linux Show Player')
+    parser.add_argument('--output', help='File to write the compiled MIDI to (default: stdout)')
+    args = parser.parse_args()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            totals = compile_session_file(args.session, output_file)
+    else:
+        totals = compile_session_file(args.session, sys.stdout)
+
+    print(f"{totals['cues']} cues; {totals['messages']} messages, {totals['bytes']} bytes, "
+          f"{totals['wire_time']:.3f}s on the wire (at most {totals['max_wire_time']:.3f}s "
+          "for any one cue)", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+
+'''Fixtures shared by the tests
+
+The tests run the plugin's models (and views) outside of Linux Show Player, using the stand-in
+plugins of the benchmarks; see `benchmarks/synthetic.py`.
+'''
+
+# pylint: disable=missing-docstring, import-outside-toplevel, wrong-import-position
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'benchmarks'))
+
+@pytest.fixture(scope='session')
+def qapp():
+    pytest.importorskip('PyQt5')
+    pytest.importorskip('lisp')
+
+    from synthetic import add_plugin_to_path, create_qapplication
+    app = create_qapplication()
+    add_plugin_to_path()
+    return app
@@ -0,0 +1,65 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# pylint: disable=missing-docstring, import-outside-toplevel
+
+# pylint: disable=import-error
+from synthetic import BenchProfile, generate_session_config, install_plugins
+
+def _assign(channel_num):
+    return {
+        'channelType': 'input',
+        'channelNum': channel_num,
+        'dcaNum': 1,
+        'assignAction': 'assign',
+    }
+
+def _listening_desk():
+    from dca_plotter.desk_feedback import DeskFeedback
+    from dca_plotter.tracker.model import DcaTrackingModel
+    from dca_plotter.virtual_desk import VirtualDesk
+
+    install_plugins(generate_session_config(dca_count=4, inputs=8, fx=2, roles=2, choirs=1))
+    tracker = DcaTrackingModel(False)
+    feedback = DeskFeedback(tracker, BenchProfile())
+    desk = VirtualDesk(BenchProfile(), echo=feedback.receive)
+    return tracker, desk
+
+def _first_dca_assigns(tracker):
+    return tracker.root.child(0).child(0).getChildValues()
+
+def test_hand_assign_of_patched_channel_is_tracked(qapp):
+    tracker, desk = _listening_desk()
+
+    desk.change_by_hand('assignToDca', _assign(3))
+    qapp.processEvents()
+
+    assert ('input', 3) in _first_dca_assigns(tracker)
+
+def test_hand_assign_of_unpatched_channel_is_ignored(qapp):
+    tracker, desk = _listening_desk()
+
+    desk.change_by_hand('assignToDca', _assign(20))
+    qapp.processEvents()
+
+    assert not _first_dca_assigns(tracker)
@@ -0,0 +1,101 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# pylint: disable=missing-docstring, import-outside-toplevel, protected-access
+
+# pylint: disable=import-error
+from synthetic import create_cues, generate_session_config, generate_show, install_plugins
+
+def _renumber(cues):
+    for index, cue in enumerate(cues):
+        cue.index = index
+
+def _assert_layout_matches(view, model):
+    '''Checks the view's cell sizes describe the model's rows, as they are now'''
+    # pylint: disable=no-name-in-module
+    from PyQt5.QtCore import QModelIndex
+
+    view._recalculate_cell_size()
+    assert len(view._cell_sizes) == model.rowCount(QModelIndex())
+
+    for row_num, row_dimensions in enumerate(view._cell_sizes):
+        row_index = model.index(row_num, 0, QModelIndex())
+        assert len(row_dimensions['blocks']) == model.rowCount(row_index)
+        for block_num, block_dimensions in enumerate(row_dimensions['blocks']):
+            block_index = model.index(block_num, 0, row_index)
+            assert len(block_dimensions['entries']) == model.rowCount(block_index)
+
+def _mapped_view(cue_count):
+    from dca_plotter.mapper.model import DcaMappingModel
+    from dca_plotter.mapper.view import DcaMappingView
+
+    session_config = generate_session_config(dca_count=4, inputs=8, fx=2, roles=2, choirs=1)
+    plugin = install_plugins(session_config)
+    cues = create_cues(generate_show(session_config, cue_count, reset_every=20))
+
+    plugin._mapping_model = DcaMappingModel()
+    for cue in cues:
+        plugin.mapper().append_cuerow(cue)
+
+    view = DcaMappingView()
+    view.setModel(plugin.mapper())
+    view.resize(800, 600)
+    _assert_layout_matches(view, plugin.mapper())
+    return plugin.mapper(), view, cues
+
+def test_view_follows_bulk_remove(qapp):
+    mapper, view, cues = _mapped_view(60)
+
+    removed = cues[20:30]
+    del cues[20:30]
+    _renumber(cues)
+    mapper.remove_cuerows(removed)
+    qapp.processEvents()
+
+    _assert_layout_matches(view, mapper)
+
+def test_view_follows_bulk_move(qapp):
+    mapper, view, cues = _mapped_view(60)
+
+    moved = cues[1:6]
+    del cues[1:6]
+    cues[30:30] = moved
+    _renumber(cues)
+    mapper.move_cuerows(moved)
+    qapp.processEvents()
+
+    _assert_layout_matches(view, mapper)
+
+def test_view_follows_single_move_and_remove(qapp):
+    mapper, view, cues = _mapped_view(30)
+
+    moved = cues.pop(2)
+    cues.insert(12, moved)
+    _renumber(cues)
+    mapper.move_cuerows([moved])
+    _assert_layout_matches(view, mapper)
+
+    removed = cues.pop(5)
+    _renumber(cues)
+    mapper.remove_cuerows([removed])
+    _assert_layout_matches(view, mapper)
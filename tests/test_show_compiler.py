@@ -0,0 +1,82 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# pylint: disable=missing-docstring, import-outside-toplevel
+
+import json
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+
+PLUGINS_FOLDER = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _dca_changes(names):
+    return [{'name': name, 'add': [], 'rem': []} for name in names]
+
+def _save_session(filename):
+    '''Saves a small show, as Linux Show Player would'''
+    lisp = pytest.importorskip('lisp')
+
+    cues = [
+        {'_type_': 'DcaChangeCue', 'name': 'Scene 1',
+         'dca_changes': _dca_changes(['Band', 'Leads'] + [False] * 6)},
+        {'_type_': 'DcaChangeCue', 'name': 'Scene 2',
+         'dca_changes': _dca_changes([False, 'Chorus'] + [False] * 6)},
+        {'_type_': 'DcaResetCue', 'name': 'Reset'},
+    ]
+    for index, cue in enumerate(cues):
+        cue['id'] = uuid.uuid4().hex
+        cue['index'] = index
+
+    with open(filename, 'w', encoding='utf-8') as session_file:
+        json.dump({
+            'meta': {'version': lisp.__version__},
+            'session': {'layout_type': 'ListLayout'},
+            'cues': cues,
+        }, session_file)
+    return cues
+
+def test_compiles_a_saved_session(tmp_path):
+    pytest.importorskip('PyQt5')
+
+    session_filename = tmp_path / 'show.lsp'
+    output_filename = tmp_path / 'show.jsonl'
+    cues = _save_session(session_filename)
+
+    environment = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    environment['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [PLUGINS_FOLDER, environment.get('PYTHONPATH')]))
+    subprocess.run([sys.executable, '-m', 'dca_plotter.show_compiler',
+                    str(session_filename), '--output', str(output_filename)],
+                   env=environment, check=True, timeout=120)
+
+    with open(output_filename, 'r', encoding='utf-8') as output_file:
+        lines = [json.loads(line) for line in output_file]
+
+    assert [(line['index'], line['id'], line['name']) for line in lines[:-1]] == \
+        [(cue['index'], cue['id'], cue['name']) for cue in cues]
+    assert lines[-1]['totals']['cues'] == len(cues)
+    assert lines[-1]['totals']['messages'] == sum(line['message_count'] for line in lines[:-1])
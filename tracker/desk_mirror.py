@@ -0,0 +1,122 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=missing-docstring
+
+import logging
+from queue import Queue
+from threading import Thread
+
+from .desk_shadow import DeskShadow
+
+logger = logging.getLogger(__name__) # pylint: disable=invalid-name
+
+class DeskMirror:
+    '''Transmits to a further DCA-capable desk, in step with - but never holding up - the main one
+
+    Each mirror has its own queue of changes, worked through by its own thread, and keeps its
+    own shadow of what its desk has been sent. A mirror that is slow, or failing, only falls
+    behind itself.
+
+    Submitting changes only queues them: they're resolved to desk commands (using the mirror's
+    own copy of its desk's profile, looked up again only once the fixture configuration has
+    changed), built into MIDI and sent by the mirror's thread. So nothing a mirror does happens
+    on the thread transmitting to the main desk.
+    '''
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, output, resolve_commands):
+        self.device = output.device()
+        self._output = output
+        self._resolve_commands = resolve_commands
+        self._shadow = DeskShadow()
+        self._queue = Queue()
+
+        self.submitted = 0
+        self.transmitted = 0
+        self.messages = 0
+        self.failures = 0
+        self.last_error = None
+
+        self._thread = Thread(target=self._run, name=f'DCA mirror: {self.device}', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        '''Stops the mirror's thread, once it's done with what's already been submitted'''
+        self._queue.put(None)
+
+    def distrust(self):
+        self._queue.put(self._shadow.distrust)
+
+    def invalidate(self):
+        self._queue.put(self._output.invalidate)
+
+    def status(self):
+        return {
+            'device': self.device,
+            'health': self._output.health,
+            'submitted': self.submitted,
+            'transmitted': self.transmitted,
+            'queued': self._queue.qsize(),
+            'messages': self.messages,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
+
+    def submit(self, changes):
+        self.submitted += 1
+        self._queue.put(list(changes))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if callable(item):
+                item()
+                continue
+
+            try:
+                dict_msgs = self._build_messages(item)
+                self._output.send_batch(dict_msgs)
+                self.messages += len(dict_msgs)
+                self.transmitted += 1
+            except Exception as exception: # pylint: disable=broad-except
+                # We no longer know what this desk has; resync it with the next changes.
+                self._shadow.distrust()
+                self.failures += 1
+                self.last_error = str(exception)
+                logger.error('Transmitting to DCA device "%s" failed: %s', self.device, exception)
+
+    def _build_messages(self, changes):
+        profile = self._output.profile()
+        if not profile:
+            return []
+
+        dict_msgs = []
+        for command, args in self._resolve_commands(changes, self.device, profile):
+            # Skip anything that wouldn't change what the desk already has
+            if self._shadow.is_redundant(command, args):
+                continue
+            self._shadow.record(command, args)
+            dict_msgs.extend(profile.build_command(command, args))
+        return dict_msgs
@@ -0,0 +1,109 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=missing-docstring
+
+# pylint: disable=import-error
+from lisp.plugins import get_plugin
+from lisp.plugins.midi.midi_utils import midi_from_dict
+
+class DeskOutput:
+    '''A ready-to-use connection to a DCA-capable device's MIDI output (and its profile)
+
+    The device's patch and profile are looked up once, and then again only if told that the
+    configuration has changed, if the device being followed changes, or after a send has failed
+    (in case the port has since come back under a different patch).
+
+    If no device is given, the session's main DCA device is followed.
+    '''
+    UNRESOLVED = 'unresolved'
+    READY = 'ready'
+    FAILING = 'failing'
+    UNAVAILABLE = 'unavailable'
+
+    def __init__(self, midi, device=None):
+        self._midi = midi
+        self._device = device
+        self._resolved_device = None
+        self._patch = None
+        self._profile = None
+
+        self.health = self.UNRESOLVED
+        self.failures = 0
+        self.last_error = None
+
+    def device(self):
+        if self._device is not None:
+            return self._device
+        return get_plugin('MidiFixtureControl').SessionConfig['dca_device']
+
+    def invalidate(self):
+        '''Have the patch and profile looked up again before the next send'''
+        self._resolved_device = None
+        if self.health != self.FAILING:
+            self.health = self.UNRESOLVED
+
+    def profile(self):
+        self._resolve()
+        return self._profile
+
+    def send(self, dict_msg):
+        self.send_batch((dict_msg,))
+
+    def send_batch(self, dict_msgs):
+        '''Sends messages (as dicts) to the device, one after the other
+
+        Raises whatever sending raises; the output is then marked as failing until a send succeeds.
+        '''
+        if not self._resolve():
+            return
+        try:
+            for dict_msg in dict_msgs:
+                self._midi.send(self._patch, midi_from_dict(dict_msg))
+        except Exception as exception:
+            self.health = self.FAILING
+            self.failures += 1
+            self.last_error = str(exception)
+            self._resolved_device = None
+            raise
+        self.health = self.READY
+
+    def use_midi(self, midi):
+        '''Send through something other than the Midi plugin (e.g. a VirtualDesk)'''
+        self._midi = midi
+
+    def _resolve(self):
+        device = self.device()
+        if device and device == self._resolved_device:
+            return True
+
+        if not device:
+            self.health = self.UNAVAILABLE
+            return False
+
+        fixture_control = get_plugin('MidiFixtureControl')
+        self._patch = fixture_control.get_patched_output(device)
+        self._profile = fixture_control.get_profile(device)
+        self._resolved_device = device
+        if self.health != self.FAILING:
+            self.health = self.READY
+        return True
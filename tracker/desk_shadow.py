@@ -0,0 +1,123 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=missing-docstring
+
+from collections import deque
+from threading import Lock
+import time
+
+# What a desk is assumed to be doing with a strip we've not been told about
+_ASSUMED = {
+    'assign': False,
+    'mute': True,
+}
+
+class DeskShadow:
+    '''The last known state of the desk: DCA names, DCA assignments and mutes
+
+    Everything is keyed by what is actually sent to the desk (after roles and channel
+    numbering have been resolved), so a message that would leave the desk as it already
+    is can be recognised and dropped.
+
+    Anything that hasn't been transmitted since the shadow was created, or last told to
+    distrust itself, is unknown - and so always sent.
+
+    What is about to be transmitted may also be noted, so that the desk echoing it back can
+    be told apart from a change made on the desk by hand.
+    '''
+
+    # How long (in seconds) after transmitting something its echo is looked out for
+    ECHO_WINDOW = 2.0
+
+    def __init__(self, clock=time.monotonic):
+        self._state = {}
+        self._expected = {}
+        self._expected_lock = Lock()
+        self._clock = clock
+
+    def differences(self, other):
+        '''Returns (key, ours, theirs) for everything this and another shadow disagree on'''
+        # pylint: disable=protected-access
+        differences = []
+        for key in set(self._state) | set(other._state):
+            ours = self._state.get(key, _ASSUMED.get(key[0]))
+            theirs = other._state.get(key, _ASSUMED.get(key[0]))
+            if ours != theirs:
+                differences.append((key, ours, theirs))
+        return differences
+
+    def consume_echo(self, command, args):
+        '''Returns whether what the desk has reported is the echo of something transmitted
+
+        The expected echo (and any expected before it, which have evidently been superseded)
+        is forgotten, so each transmission accounts for one echo only.
+        '''
+        key, value = _shadow_entry(command, args)
+        if key is None:
+            return False
+
+        with self._expected_lock:
+            expected = self._expected.get(key)
+            if not expected:
+                return False
+
+            expired = self._clock() - self.ECHO_WINDOW
+            while expected and expected[0][1] < expired:
+                expected.popleft()
+
+            for num, (expected_value, _) in enumerate(expected):
+                if expected_value == value:
+                    for _ in range(num + 1):
+                        expected.popleft()
+                    return True
+            return False
+
+    def distrust(self):
+        '''Forget everything known, so that everything is sent again'''
+        self._state.clear()
+
+    def expect_echo(self, command, args):
+        '''Notes that something is about to be transmitted, so its echo is to be expected'''
+        key, value = _shadow_entry(command, args)
+        if key is not None:
+            with self._expected_lock:
+                self._expected.setdefault(key, deque()).append((value, self._clock()))
+
+    def is_redundant(self, command, args):
+        key, value = _shadow_entry(command, args)
+        return key is not None and self._state.get(key, None) == value
+
+    def record(self, command, args):
+        key, value = _shadow_entry(command, args)
+        if key is not None:
+            self._state[key] = value
+
+def _shadow_entry(command, args):
+    if command == 'assignToDca':
+        return ('assign', args['channelType'], args['channelNum'], args['dcaNum']), \
+            args['assignAction'] == 'assign'
+    if command == 'mute':
+        return ('mute', args['channelType'], args['channelNum']), args['muteAction'] == 'mute'
+    if command == 'setName':
+        return ('name', args['channelType'], args['channelNum']), args['asciiString']
+    return None, None
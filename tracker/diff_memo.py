@@ -0,0 +1,77 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=missing-docstring
+
+from collections import OrderedDict
+
+class DiffMemo:
+    '''Remembers the changes calculated for cues, and the MIDI those changes resolve to
+
+    When there is no mapper (e.g. in a cart layout) the same few cues tend to be called again
+    and again, from the same few states. Changes are remembered by the state of the tracker
+    (its hash), what the cue asks for, and the generation of the configuration; the MIDI by
+    the device and the changes themselves. Only the most recently used are kept.
+
+    What is returned is shared with later callers, so must not be altered.
+    '''
+
+    def __init__(self, size=64):
+        self._size = size
+        self._changes = OrderedDict()
+        self._deliveries = OrderedDict()
+        self._generation = 0
+
+    def changes(self, state_hash, dca_changes, calculate):
+        '''Returns the changes for a cue, calling `calculate()` to get them if not remembered'''
+        key = (state_hash, _freeze(dca_changes), self._generation)
+        return self._recall(self._changes, key, calculate)
+
+    def deliveries(self, changes, device, resolve):
+        '''Returns what changes resolve to for a device, calling `resolve()` if not remembered'''
+        key = (device, _freeze(changes), self._generation)
+        return self._recall(self._deliveries, key, resolve)
+
+    def invalidate(self):
+        '''Forgets everything, as what's remembered was worked out from an older configuration'''
+        self._generation += 1
+        self._changes.clear()
+        self._deliveries.clear()
+
+    def _recall(self, entries, key, calculate):
+        if key in entries:
+            entries.move_to_end(key)
+            return entries[key]
+
+        value = calculate()
+        entries[key] = value
+        if len(entries) > self._size:
+            entries.popitem(last=False)
+        return value
+
+def _freeze(value):
+    '''Returns a hashable equivalent of something built from dicts, lists and tuples'''
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
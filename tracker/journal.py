@@ -0,0 +1,196 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=missing-docstring
+
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__) # pylint: disable=invalid-name
+
+class DeskJournal:
+    '''An append-only record of what the tracker has committed, for recovering after a crash
+
+    The journal is a file of JSON lines: a snapshot of the currently active (DCA names and
+    assigns) followed by the changes committed since, one line per applied cue. Each line is
+    flushed to disk as it is written, and once enough lines have built up the file is rewritten
+    as a fresh snapshot.
+
+    Mutes are not kept: as with the tracker, they're derived from the assigns.
+
+    The snapshot also notes which session file the journal is for, so that journals no saved
+    session refers to any more can be found (see `prune_journals()`).
+    '''
+
+    # How many lines of changes are written before the journal is compacted
+    COMPACT_AFTER = 100
+
+    def __init__(self, path, session_file=''):
+        self._path = path
+        self._session_file = session_file
+        self._file = None
+        self._line_count = 0
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        '''Closes and deletes the journal, as there's nothing to recover from it'''
+        self.close()
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
+
+    def compact(self, names, assigns):
+        '''Replaces the journal with a snapshot of the given state
+
+        The snapshot is written alongside, and then moved over the existing journal, so that
+        there is always a complete journal on disk.
+        '''
+        self.close()
+        os.makedirs(os.path.dirname(self._path) or '.', exist_ok=True)
+
+        snapshot_path = self._path + '.snapshot'
+        with open(snapshot_path, 'w', encoding='utf-8') as snapshot_file:
+            snapshot_file.write(json.dumps({
+                'session_file': self._session_file,
+                'snapshot': {
+                    'names': names,
+                    'assigns': assigns,
+                }
+            }) + '\n')
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(snapshot_path, self._path)
+
+        self._file = open(self._path, 'a', encoding='utf-8') # pylint: disable=consider-using-with
+        self._line_count = 0
+
+    def needs_compaction(self):
+        return self._file is None or self._line_count >= self.COMPACT_AFTER
+
+    def record(self, changes):
+        '''Appends the assigns, unassigns and renames just committed'''
+        if not changes or self._file is None:
+            return
+
+        self._file.write(json.dumps({'changes': changes}) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._line_count += 1
+
+    def replay(self, dca_count):
+        '''Returns the (names, assigns) the journal ends with, or None if there's nothing usable
+
+        names is a list of DCA names, and assigns a list (per DCA) of lists of channel tuples.
+        A line that cannot be read - as happens if we crashed whilst it was being written - ends
+        the replay early.
+        '''
+        if not os.path.exists(self._path):
+            return None
+
+        names = None
+        assigns = None
+        with open(self._path, 'r', encoding='utf-8') as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning('The DCA journal ends part-way through an entry.')
+                    break
+
+                if 'snapshot' in entry:
+                    names = entry['snapshot']['names']
+                    assigns = [
+                        [tuple(assign) for assign in dca] for dca in entry['snapshot']['assigns']
+                    ]
+                    if len(names) != dca_count or len(assigns) != dca_count:
+                        return None
+                    continue
+
+                if assigns is None:
+                    return None
+
+                try:
+                    for action, args in entry['changes']:
+                        _replay_change(names, assigns, action, args)
+                except (IndexError, KeyError, TypeError, ValueError):
+                    logger.warning('The DCA journal contains changes that cannot be replayed.')
+                    return None
+
+        if assigns is None:
+            return None
+        return names, assigns
+
+def prune_journals(folder, keep=()):
+    '''Deletes the journals in a folder that no saved session refers to any more
+
+    A journal is kept for as long as the session file it was written for exists and still
+    holds the journal's id. (Journals are named for their ids.)
+    '''
+    try:
+        filenames = os.listdir(folder)
+    except FileNotFoundError:
+        return
+
+    for filename in filenames:
+        journal_id, extension = os.path.splitext(filename)
+        if extension != '.jsonl' or journal_id in keep:
+            continue
+
+        path = os.path.join(folder, filename)
+        if not session_references_journal(recorded_session_file(path), journal_id):
+            logger.info('Removing the DCA journal %s, as no saved session refers to it.', filename)
+            DeskJournal(path).discard()
+
+def recorded_session_file(path):
+    '''Returns the session file a journal was written for, or an empty string if unknown'''
+    try:
+        with open(path, 'r', encoding='utf-8') as journal_file:
+            return json.loads(journal_file.readline()).get('session_file', '')
+    except (OSError, ValueError, AttributeError):
+        return ''
+
+def session_references_journal(session_file, journal_id):
+    '''Whether a saved session file holds the given journal id'''
+    if not session_file or not journal_id:
+        return False
+    try:
+        with open(session_file, 'r', encoding='utf-8') as file:
+            return journal_id in file.read()
+    except (OSError, ValueError):
+        return False
+
+def _replay_change(names, assigns, action, args):
+    strip = tuple(args['strip'])
+    if action == 'assign':
+        if strip not in assigns[args['dca']]:
+            assigns[args['dca']].append(strip)
+    elif action == 'unassign':
+        if strip in assigns[args['dca']]:
+            assigns[args['dca']].remove(strip)
+    elif action == 'rename':
+        names[args['dca']] = args['name']
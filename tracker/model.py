@@ -22,20 +22,28 @@
 
 # pylint: disable=missing-docstring, invalid-name
 
+from collections import Counter, deque
+from itertools import chain
 import logging
+from threading import Lock, current_thread, main_thread
+import time
 
 # pylint: disable=no-name-in-module
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 
 # pylint: disable=import-error
 from lisp.application import Application
+from lisp.core.signal import Connection, Signal
 from lisp.plugins import get_plugin
-from lisp.plugins.midi.midi_utils import midi_from_dict
 
 # pylint: disable=relative-beyond-top-level
 from ..cue.change_cue import DcaChangeCue
 from ..model_primitives import AssignStateEnum, DcaModelTemplate, ModelsAssignRow, ModelsEntry
 from ..utilities import get_name_for_empty_dca
+from .desk_mirror import DeskMirror
+from .diff_memo import DiffMemo
+from .desk_output import DeskOutput
+from .desk_shadow import DeskShadow
 
 logger = logging.getLogger(__name__) # pylint: disable=invalid-name
 
@@ -68,15 +76,51 @@ logger = logging.getLogger(__name__) # pylint: disable=invalid-name
 class DcaTrackingModel(DcaModelTemplate):
 
     _cached_changes = []
+    _journal = None
     _last_selected_cue_id = None
     _predictive_row_enabled = False
     _cue_in_progress = False
     hideEmptyDcaNames = False
 
+    # How many applied cues can be stepped back through
+    HISTORY_LENGTH = 32
+
+    # How many times sending a message is attempted before it's given up on, and how long is
+    # waited before the first retry (doubling for each retry after). On the Qt (UI) thread,
+    # which mustn't be held up, there's just the one immediate retry.
+    DELIVERY_ATTEMPTS = 4
+    RETRY_DELAY = 0.05
+
+    # How many calculated diffs (and the MIDI they resolve to) are remembered
+    MEMO_SIZE = 64
+
+    # How long (in milliseconds) regenerating the predictive row waits for any further edits
+    REGENERATION_DELAY = 50
+
     def __init__(self, show_predictive_row):
         super().__init__()
         self._midi = get_plugin('Midi')
-        self._fixture_control = get_plugin('MidiFixtureControl')
+        self._output = DeskOutput(self._midi)
+        self._history = deque(maxlen=self.HISTORY_LENGTH)
+        self._pending_cues = []
+        self._pending_lock = Lock()
+        self._transmitting = False
+        self._prearmed = []
+        self._desk_shadow = DeskShadow()
+
+        # Desk reports held back whilst a GO was transmitted, to be reconciled (on the Qt
+        # thread) once it's done
+        self._held_reports = []
+        self._release_report = Signal()
+        self._release_report.connect(self.reconcile_desk_command, Connection.QtQueued)
+        self._mirrors = []
+        self._dead_letters = []
+        self._memo = DiffMemo(self.MEMO_SIZE)
+
+        self._regeneration_timer = QTimer()
+        self._regeneration_timer.setSingleShot(True)
+        self._regeneration_timer.setInterval(self.REGENERATION_DELAY)
+        self._regeneration_timer.timeout.connect(self.regenerate_current)
 
         # Current/Active Assigns
         self._add_node(self.createIndex(0, 0, self.root), ModelsAssignRow(parent=self.root))
@@ -87,59 +131,323 @@ class DcaTrackingModel(DcaModelTemplate):
             self._predictive_row_enabled = True
 
     def call_cue(self, cue):
+        # If the MIDI of a previous GO is still being transmitted, queue this cue: the thread
+        # doing the transmitting will pick it up (along with any others that arrive in the
+        # meantime) once it's done.
+        with self._pending_lock:
+            self._pending_cues.append(cue)
+            if self._transmitting:
+                return
+            self._transmitting = True
+
         self._cue_in_progress = True
-        if self._cached_changes and cue.id == self._last_selected_cue_id:
-            changes = self._cached_changes
-        elif isinstance(cue, DcaChangeCue):
-            if self._predictive_row_enabled:
-                changes = self.calculate_diff_from_mapper(cue.id)
-            else:
-                changes = self.calculate_diff(cue.dca_changes)
-        elif cue.properties().get('force_clear'):
-            changes = self.cancel_everything()
-        else:
-            changes = self.cancel_current()
+        try:
+            while True:
+                with self._pending_lock:
+                    queued_cues = self._pending_cues
+                    self._pending_cues = []
+                    if not queued_cues:
+                        self._transmitting = False
+                        held_reports = self._held_reports
+                        self._held_reports = []
+                        break
+
+                # A force clear supersedes anything queued before it, and is always sent in full.
+                for queued_num in range(len(queued_cues) - 1, -1, -1):
+                    if _is_force_clear(queued_cues[queued_num]):
+                        self._apply_cue(queued_cues[queued_num])
+                        queued_cues = queued_cues[queued_num + 1:]
+                        break
+
+                if len(queued_cues) == 1:
+                    self._apply_cue(queued_cues[0])
+                elif queued_cues:
+                    self._apply_cues_collapsed(queued_cues)
+        except Exception:
+            # Don't leave later GOs waiting on a transmission that's never going to finish
+            with self._pending_lock:
+                self._pending_cues = []
+                self._transmitting = False
+                held_reports = self._held_reports
+                self._held_reports = []
+            for report in held_reports:
+                self._release_report.emit(*report)
+            raise
+        finally:
+            self._cue_in_progress = False
+
+        for report in held_reports:
+            self._release_report.emit(*report)
+
+        if self._predictive_row_enabled:
+            # If the cue selection has changed whilst the cue was running,
+            # or this is the last cue in the list, call the slot again
+            cue_model = Application().cue_model
+            cue_next = cue_model.get(self._last_selected_cue_id)
+            if cue_next and (cue.id != self._last_selected_cue_id or cue_next.index + 1 == len(cue_model)):
+                self.select_cue(cue_next)
+
+    def _apply_cue(self, cue):
+        changes = self._calculate_cue_changes(cue, True)
+
+        # A force clear is intended to get us back in sync with the desk,
+        # so we can't rely on what we think the desk's state is.
+        if _is_force_clear(cue):
+            self.distrust_desk_state()
+            self._dead_letters = []
+        self._supersede_dead_letters()
 
         # Here we have the MIDI sends...
         # Alternatively, as this is a *tracking* model, the diff change could be passed back
         #   and the calling cue handles sending the MIDI.
         # Then again, we don't want update the 'currently active' if sending fails... so...
-        midi_messages = determine_midi_messages(changes)
-        midi_patch = self._fixture_control.get_patched_output(
-            self._fixture_control.SessionConfig['dca_device'])
-        for dict_msg in midi_messages:
-            self._midi.send(midi_patch, midi_from_dict(dict_msg))
+        undelivered = self._transmit(self._settle_prearmed(changes))
+        changes = _without(changes, undelivered)
 
         # Update the currently active
+        self._record_history(changes)
+        self._commit_changes(changes)
+
+    def _apply_cues_collapsed(self, cues):
+        '''Catches up with several cues that were called whilst MIDI was still being transmitted
+
+        Instead of transmitting each cue's changes in turn - and with them every intermediate
+        state - the cues are applied one after the other to the currently active, and then
+        only the net difference between the start and end states is transmitted.
+        '''
         current_assigns = self.root.child(0).children
-        for change in changes:
-            if change[0] == 'assign':
-                block_node = current_assigns[change[1]['dca']]
-                self._add_node(block_node.index(),
-                               ModelsEntry(change[1]['strip'], parent=block_node))
-            elif change[0] == 'unassign':
-                block_node = current_assigns[change[1]['dca']]
-                try:
-                    entry_num = block_node.getChildValues().index(change[1]['strip'])
-                except ValueError:
-                    pass
-                else:
-                    entry_node = block_node.child(entry_num)
-                    self._remove_node(entry_node.index())
-            elif change[0] == 'rename':
-                current_assigns[change[1]['dca']].setData(change[1]['name'], Qt.EditRole)
-                if self._predictive_row_enabled:
-                    self.root.child(1).children[change[1]['dca']].setInherited(change[1]['name'])
+        initial_names = [dca_node.data() for dca_node in current_assigns]
+        initial_assigns = [dca_node.getChildValues() for dca_node in current_assigns]
+
+        self._supersede_dead_letters()
+
+        all_changes = []
+        for cue in cues:
+            changes = self._calculate_cue_changes(cue, False)
+            self._record_history(changes)
+            self._commit_changes(changes)
+            all_changes.extend(changes)
+
+        undelivered = self._transmit(self._settle_prearmed(
+            _collapse_actions(all_changes, initial_names, initial_assigns)))
+
+        # What couldn't be delivered has already been committed, so has to be backed out again
+        reverts = []
+        for action in undelivered:
+            if action[0] == 'assign':
+                reverts.append(_create_unassign_action({}, action[1]['dca'], action[1]['strip']))
+            elif action[0] == 'unassign':
+                reverts.append(_create_assign_action({}, action[1]['dca'], action[1]['strip']))
+            elif action[0] == 'rename':
+                reverts.append(_create_rename_action(action[1]['dca'],
+                                                     initial_names[action[1]['dca']]))
+        self._commit_changes(reverts)
+
+    def load_cue_state(self, cue):
+        '''Brings the desk to the state it would be in just after the given cue, without running it.
+
+        The mapper already holds the complete effective state (inherits included) of every
+        cue-row, so we don't need to replay the cues leading up to it: only the difference
+        between what is currently active and that state is transmitted.
+
+        Note: this transmits MIDI immediately
+        '''
+        if not self._predictive_row_enabled:
+            return
 
-        self._cue_in_progress = False
+        self._cue_in_progress = True
+        try:
+            if isinstance(cue, DcaChangeCue):
+                changes = self.calculate_diff_from_mapper(cue.id)
+            else:
+                changes = self.cancel_current()
+
+            self._supersede_dead_letters()
+            changes = _without(changes, self._transmit(self._settle_prearmed(changes)))
+            self._record_history(changes)
+            self._commit_changes(changes)
+        finally:
+            self._cue_in_progress = False
+
+        self.regenerate_current()
+
+    def step_back(self):
+        '''Reverts the most recently applied cue, restoring the assigns, names and mutes from before it
+
+        Note: this transmits MIDI immediately
+        '''
+        if not self._history:
+            return
+
+        actions, previous_names = self._history.pop()
+        assign_changes = {}
+        inverse = []
+        for action in reversed(actions):
+            if action[0] == 'assign':
+                inverse.append(_create_unassign_action(assign_changes,
+                                                       action[1]['dca'],
+                                                       action[1]['strip']))
+            elif action[0] == 'unassign':
+                inverse.append(_create_assign_action(assign_changes,
+                                                     action[1]['dca'],
+                                                     action[1]['strip']))
+            elif action[0] == 'rename':
+                inverse.append(_create_rename_action(action[1]['dca'],
+                                                     previous_names[action[1]['dca']]))
+        inverse.extend(_calculate_mutes(assign_changes))
+
+        self._cue_in_progress = True
+        try:
+            self._supersede_dead_letters()
+            undelivered = self._transmit(self._settle_prearmed(inverse))
+            self._commit_changes(_without(inverse, undelivered))
+        finally:
+            self._cue_in_progress = False
 
         if self._predictive_row_enabled:
-            # If the cue selection has changed whilst the cue was running,
-            # or this is the last cue in the list, call the slot again
-            cue_model = Application().cue_model
-            cue_next = cue_model.get(self._last_selected_cue_id)
-            if cue_next and (cue.id != self._last_selected_cue_id or cue_next.index + 1 == len(cue_model)):
-                self.select_cue(cue_next)
+            self.regenerate_current()
+
+    def active_changes(self):
+        '''Returns the changes that would take a blank desk to what is currently active'''
+        cue_actions = []
+        assign_changes = {}
+        for dca_num, dca_node in enumerate(self.root.child(0).children):
+            cue_actions.append(_create_rename_action(dca_num, dca_node.data()))
+            for channel_tuple in dca_node.getChildValues():
+                cue_actions.append(_create_assign_action(assign_changes, dca_num, channel_tuple))
+        cue_actions.extend(_calculate_mutes(assign_changes))
+        return cue_actions
+
+    def reconcile_desk_command(self, command, args, channel_tuple):
+        '''Brings what is currently active in line with something the desk has reported
+
+        channel_tuple is the strip the report is about, or None if it's not one we know.
+
+        Reports that match what was recently transmitted are the desk echoing what it was
+        sent, so only tell us what the desk has (and so needn't be sent again).
+
+        Must be called from the Qt (UI) thread. Reports arriving whilst a GO is being
+        transmitted are held back until it's done.
+        '''
+        with self._pending_lock:
+            if self._transmitting:
+                self._held_reports.append((command, args, channel_tuple))
+                return
+
+        echoed = self._desk_shadow.consume_echo(command, args)
+        self._desk_shadow.record(command, args)
+        if echoed or not channel_tuple:
+            return
+
+        current_assigns = self.root.child(0).children
+        changes = []
+        if command == 'setName':
+            dca_num = args['channelNum'] - 1
+            if dca_num < len(current_assigns) \
+               and current_assigns[dca_num].data() != args['asciiString']:
+                changes.append(_create_rename_action(dca_num, args['asciiString']))
+
+        elif command == 'assignToDca' and args['dcaNum'] <= len(current_assigns):
+            dca_num = args['dcaNum'] - 1
+            resolve_role = get_plugin('DcaPlotter').resolve_role
+            present = [
+                entry for entry in current_assigns[dca_num].getChildValues()
+                if entry == channel_tuple \
+                   or entry[0] == 'role' and resolve_role(entry[1]) == channel_tuple
+            ]
+            if args['assignAction'] == 'assign' and not present:
+                changes.append(_create_assign_action({}, dca_num, channel_tuple))
+            elif args['assignAction'] == 'unassign':
+                changes.extend(_create_unassign_action({}, dca_num, entry) for entry in present)
+
+        # (Mutes aren't tracked: they're derived from the assigns.)
+
+        if changes:
+            self._commit_changes(changes)
+            if self._predictive_row_enabled:
+                self.regenerate_current()
+
+    def use_journal(self, journal):
+        '''Journals what is committed from now on, having first recovered what it last recorded
+
+        What is recovered is taken to be what the desk is currently set to (as it will be if we
+        are being restarted after a crash), and becomes the currently active. Nothing is
+        transmitted: the next cue sends only what it changes.
+
+        Strips the session doesn't (or no longer) has are not recovered.
+        '''
+        current_assigns = self.root.child(0).children
+        recovered = journal.replay(len(current_assigns))
+        if recovered:
+            names, assigns = recovered
+            session_assigns = get_plugin('DcaPlotter').SessionConfig['assigns']
+            changes = []
+            unknown = 0
+            for dca_num, name in enumerate(names):
+                if name:
+                    changes.append(_create_rename_action(dca_num, name))
+                for channel_tuple in assigns[dca_num]:
+                    if _is_known_strip(channel_tuple, session_assigns):
+                        changes.append(_create_assign_action({}, dca_num, channel_tuple))
+                    else:
+                        unknown += 1
+            if unknown:
+                logger.warning('%d DCA assigns in the journal are of strips this session does '
+                               'not have, so were not recovered.', unknown)
+            self._commit_changes(changes)
+
+        journal.compact(*self._journal_state())
+        self._journal = journal
+
+    def close_journal(self, discard=False):
+        '''Stops journalling, deleting the journal if what it holds won't be wanted again'''
+        if self._journal:
+            if discard:
+                self._journal.discard()
+            else:
+                self._journal.close()
+            self._journal = None
+
+    def use_midi_output(self, midi):
+        '''Transmit through something other than the Midi plugin (e.g. a VirtualDesk)'''
+        self._midi = midi
+        self._output.use_midi(midi)
+
+    def invalidate_output(self):
+        '''Have the desks' MIDI outputs looked up again, as their configuration has changed'''
+        self._memo.invalidate()
+        self._output.invalidate()
+        for mirror in self._mirrors:
+            mirror.invalidate()
+
+    def output_status(self):
+        return {
+            'device': self._output.device(),
+            'health': self._output.health,
+            'failures': self._output.failures,
+            'last_error': self._output.last_error,
+        }
+
+    def distrust_desk_state(self):
+        '''Forget what is known of the desk's state, so the next transmissions are sent in full'''
+        self._desk_shadow.distrust()
+        for mirror in self._mirrors:
+            mirror.distrust()
+
+    def mirror_to(self, devices):
+        '''Transmits everything to the given further DCA-capable devices, as well as the main one
+
+        Each device is transmitted to by its own DeskMirror, so they are sent to concurrently.
+        '''
+        for mirror in self._mirrors:
+            mirror.close()
+        self._mirrors = [
+            DeskMirror(DeskOutput(self._midi, device), resolve_desk_commands)
+            for device in devices if device != self._output.device()
+        ]
+
+    def mirror_status(self):
+        return [mirror.status() for mirror in self._mirrors]
 
     def clear_current_diff(self):
         '''Clears current diff state.'''
@@ -148,6 +456,18 @@ class DcaTrackingModel(DcaModelTemplate):
             self._clear_node(block_node.index())
             block_node.setData("", Qt.EditRole)
 
+    def schedule_regeneration(self):
+        '''Regenerates the predictive row once edits (to cues or configuration) have settled
+
+        Must be called from the Qt (UI) thread.
+        '''
+        if not self._predictive_row_enabled:
+            return
+
+        # In case a GO arrives before then, don't let it use a diff calculated before the edits
+        self._cached_changes = []
+        self._regeneration_timer.start()
+
     def regenerate_current(self):
         cue_model = Application().cue_model
         cue_next = cue_model.get(self._last_selected_cue_id)
@@ -162,16 +482,13 @@ class DcaTrackingModel(DcaModelTemplate):
             return
 
         self.clear_current_diff()
+        self._cached_changes = self._calculate_cue_changes(cue, False)
 
-        if isinstance(cue, DcaChangeCue):
-            if self._predictive_row_enabled:
-                self._cached_changes = self.calculate_diff_from_mapper(cue.id)
-            else:
-                self._cached_changes = self.calculate_diff(cue.dca_changes)
-        elif cue.properties().get('force_clear'):
-            self._cached_changes = self.cancel_everything()
-        else:
-            self._cached_changes = self.cancel_current()
+        silent_changes = []
+        if get_plugin('DcaPlotter').Config['prearm_silent_changes']:
+            silent_changes = _silent_actions(self._cached_changes)
+        if silent_changes or self._prearmed:
+            self._prearm(silent_changes)
 
         next_assigns = self.root.child(1).children
         for change in self._cached_changes:
@@ -191,10 +508,23 @@ class DcaTrackingModel(DcaModelTemplate):
                 block_node = next_assigns[change[1]['dca']]
                 block_node.setData(change[1]['name'], Qt.EditRole)
 
-    def on_cue_update(self, cue, property_name, _):
-        if cue.id != self._last_selected_cue_id or property_name != 'dca_changes':
-            return
-        self.select_cue(cue)
+    def _calculate_cue_changes(self, cue, use_cached):
+        if use_cached and self._cached_changes and cue.id == self._last_selected_cue_id:
+            return self._cached_changes
+
+        if isinstance(cue, DcaChangeCue):
+            if self._predictive_row_enabled:
+                return self.calculate_diff_from_mapper(cue.id)
+
+            # Without a mapper, the same cues tend to be called from the same states
+            return list(self._memo.changes(self.root.child(0).stateHash(),
+                                           cue.dca_changes,
+                                           lambda: self.calculate_diff(cue.dca_changes)))
+
+        if _is_force_clear(cue):
+            return self.cancel_everything()
+
+        return self.cancel_current()
 
     def cancel_current(self):
         cue_actions = []
@@ -241,11 +571,16 @@ class DcaTrackingModel(DcaModelTemplate):
 
     def calculate_diff_from_mapper(self, cue_id):
         cuerow = get_plugin('DcaPlotter').mapper().find_cuerow(cue_id)
+
+        # If the desk is already in the state the cue would leave it in, there's nothing to do
+        if cuerow.stateHash() == self.root.child(0).stateHash():
+            return []
+
         current_assigns = self.root.child(0).children
 
         cue_actions = []
         assign_changes = {}
-        explicit_singular_assigns = []
+        explicit_singular_assigns = set()
         explicit_singular_unassigns = []
         choirs = []
 
@@ -266,7 +601,7 @@ class DcaTrackingModel(DcaModelTemplate):
                     continue
 
                 if entry.assignState() != AssignStateEnum.UNASSIGN:
-                    explicit_singular_assigns.append(entry.value())
+                    explicit_singular_assigns.add(entry.value())
                 else:
                     explicit_singular_unassigns[dca_num].append(entry.value())
 
@@ -285,14 +620,14 @@ class DcaTrackingModel(DcaModelTemplate):
         for dca_num, dca_node in enumerate(cuerow.children):
 
             currently_assigned = current_assigns[dca_num].getChildValues()
-            assigned_by_cue = dca_node.getChildValues()
+            assigned_by_cue = set(dca_node.getChildValues())
 
             for choir_id, assign_action in choirs[dca_num].items():
                 assigns = get_plugin('DcaPlotter').resolve_choir(choir_id)
                 for assign in assigns:
                     if assign in explicit_singular_assigns:
                         continue
-                    assigned_by_cue.append(assign)
+                    assigned_by_cue.add(assign)
 
                     if assign not in currently_assigned:
                         if assign_action != AssignStateEnum.UNASSIGN:
@@ -328,81 +663,415 @@ class DcaTrackingModel(DcaModelTemplate):
         cue_actions = []
         current_assigns = self.root.child(0).children
         assign_changes = {}
-        full_assigned = []
         choirs = {'add': [], 'rem': []}
 
+        # What each DCA currently has, and which DCAs each strip is currently on
+        current_values = [set(dca_node.getChildValues()) for dca_node in current_assigns]
+        dcas_by_strip = {}
+        for dca_num, dca_values in enumerate(current_values):
+            for channel_tuple in dca_values:
+                dcas_by_strip.setdefault(channel_tuple, []).append(dca_num)
+
+        # What's assigned as of the DCA being looked at (once for each DCA a strip is on)
+        full_assigned = Counter()
+
         for dca_num, dca in enumerate(new_assigns):
             if dca['name'] and current_assigns[dca_num].data() != dca['name']:
                 cue_actions.append(_create_rename_action(dca_num, dca['name']))
 
-            full_assigned.extend(current_assigns[dca_num].getChildValues())
+            full_assigned.update(current_values[dca_num])
 
             for to_add in dca['add']:
                 if to_add[0] == 'choir':
                     choirs['add'].append((to_add[1], dca_num))
                     continue
-                if to_add in current_assigns[dca_num].getChildValues():
+                if to_add in current_values[dca_num]:
                     continue
-                if to_add in full_assigned:
-                    for inner_dca_num in range(len(current_assigns)):
-                        if to_add in current_assigns[inner_dca_num].getChildValues():
-                            cue_actions.append(_create_unassign_action(assign_changes, inner_dca_num, to_add))
+                if full_assigned[to_add]:
+                    for inner_dca_num in dcas_by_strip.get(to_add, []):
+                        cue_actions.append(_create_unassign_action(assign_changes, inner_dca_num, to_add))
                 else:
-                    full_assigned.append(to_add)
+                    full_assigned[to_add] += 1
                 cue_actions.append(_create_assign_action(assign_changes, dca_num, to_add))
 
             for to_rem in dca['rem']:
                 if to_rem[0] == 'choir':
                     choirs['rem'].append((to_rem[1], dca_num))
                     continue
-                if to_rem not in current_assigns[dca_num].getChildValues():
+                if to_rem not in current_values[dca_num]:
                     continue
-                full_assigned.remove(to_rem)
+                full_assigned[to_rem] -= 1
                 cue_actions.append(_create_unassign_action(assign_changes, dca_num, to_rem))
 
+        plugin = get_plugin('DcaPlotter')
+
+        # The choir groupings that have a member otherwise involved
+        involved_choirs = set()
+        if choirs['add']:
+            for channel_tuple in chain(+full_assigned, assign_changes):
+                involved_choirs.update(plugin.choirs_containing(channel_tuple))
+
         for choir_id, dca_num in choirs['add']:
-            assigns = get_plugin('DcaPlotter').resolve_choir(choir_id)
+            assigns = plugin.resolve_choir(choir_id)
+
+            # If none of the grouping's members are otherwise involved, refer to the grouping
+            # as a whole: it is expanded to its members when committed and transmitted.
+            if assigns and choir_id not in involved_choirs:
+                cue_actions.append(
+                    _create_assign_action(assign_changes, dca_num, ('choir', choir_id)))
+                continue
+
             for assign in assigns:
-                if assign in full_assigned:
+                if full_assigned[assign]:
                     continue
                 cue_actions.append(_create_assign_action(assign_changes, dca_num, assign))
+                involved_choirs.update(plugin.choirs_containing(assign))
 
         for choir_id, dca_num in choirs['rem']:
-            assigns = get_plugin('DcaPlotter').resolve_choir(choir_id)
-            for assign in assigns:
-                if assign not in current_assigns[dca_num].getChildValues():
-                    continue
-                cue_actions.append(_create_unassign_action(assign_changes, dca_num, assign))
+            for assign in current_assigns[dca_num].getChildValues():
+                if plugin.is_choir_member(choir_id, assign):
+                    cue_actions.append(_create_unassign_action(assign_changes, dca_num, assign))
 
         cue_actions.extend(_calculate_mutes(assign_changes))
         return cue_actions
 
-    def role_assign_swap(self, role_id, old_assign, new_assign):
-        '''Swaps from one assign to another within the same Role
+    def role_assign_swaps(self, swaps):
+        '''Swaps the assigns of one or more Roles, transmitting only the net change
+
+        swaps: {role_id: (old_assign, new_assign)}
+
+        Swaps that cancel each other out (two Roles on the same DCA exchanging assigns, for
+        instance) result in nothing being sent for the affected strips.
 
         Note: this transmits MIDI immediately if a swap is needed
         '''
-        role_tuple = ('role', role_id)
-        actions = []
-        changes = {}
+        # What Roles resolve to has changed
+        self._memo.invalidate()
 
-        # Find current active use of Role, and prep assign change
-        for dca_num, dca in enumerate(self.root.child(0).children):
-            if role_tuple in dca.getChildValues():
-                actions.append(_create_unassign_action(changes, dca_num, old_assign))
-                actions.append(_create_assign_action(changes, dca_num, new_assign))
+        old_assigns = {('role', role_id): old for role_id, (old, _) in swaps.items()}
+        new_assigns = {('role', role_id): new for role_id, (_, new) in swaps.items()}
+        resolve_role = get_plugin('DcaPlotter').resolve_role
+
+        def resolve(entry, assigns):
+            if entry in assigns:
+                return assigns[entry]
+            if entry[0] == 'role':
+                return resolve_role(entry[1]) or entry
+            return entry
 
-        # If the Role not currently active, then no assign change necessary
-        if not changes:
+        actions = []
+        before = set()
+        after = set()
+        for dca_num, dca in enumerate(self.root.child(0).children):
+            entries = dca.getChildValues()
+            dca_before = {resolve(entry, old_assigns) for entry in entries}
+            dca_after = {resolve(entry, new_assigns) for entry in entries}
+            before |= dca_before
+            after |= dca_after
+
+            for strip in sorted(dca_before - dca_after):
+                actions.append(_create_unassign_action({}, dca_num, strip))
+            for strip in sorted(dca_after - dca_before):
+                actions.append(_create_assign_action({}, dca_num, strip))
+
+        # If none of the Roles are currently active, then no assign change necessary
+        if not actions:
             return
+
+        changes = {strip: 0 for strip in sorted(before - after)}
+        changes.update({strip: 1 for strip in sorted(after - before)})
         actions.extend(_calculate_mutes(changes))
 
         # Transmit change
-        midi_messages = determine_midi_messages(actions)
-        midi_patch = self._fixture_control.get_patched_output(
-            self._fixture_control.SessionConfig['dca_device'])
-        for dict_msg in midi_messages:
-            self._midi.send(midi_patch, midi_from_dict(dict_msg))
+        self._transmit(actions, False)
+
+    def substitute_strip(self, channel_tuple, substitute):
+        '''Has one strip stand in for another from now on, e.g. to replace a failed radio mic
+
+        Whatever the replaced strip is currently assigned to is moved across to its substitute
+        (which is unmuted in its place). What is active - and all cues - continue to refer to
+        the replaced strip; it's only when transmitting that the substitute is used.
+
+        Note: this transmits MIDI immediately
+        '''
+        plugin = get_plugin('DcaPlotter')
+        in_use = [current for original, current in plugin.substitutes().items()
+                  if original != channel_tuple]
+        if substitute != channel_tuple and substitute in in_use:
+            logger.warning('%s is already standing in for something else.', substitute)
+            return
+
+        dca_nums = []
+        for dca_num, dca in enumerate(self.root.child(0).children):
+            for entry in dca.getChildValues():
+                if entry[0] == 'role':
+                    entry = plugin.resolve_role(entry[1])
+                if entry == substitute and substitute != channel_tuple:
+                    logger.warning('%s is currently in use, so cannot be a substitute.', substitute)
+                    return
+                if entry == channel_tuple:
+                    dca_nums.append(dca_num)
+
+        # Release the desk channel being replaced...
+        changes = {}
+        actions = [_create_unassign_action(changes, dca_num, channel_tuple) for dca_num in dca_nums]
+        actions.extend(_calculate_mutes(changes))
+        self._transmit(actions, False)
+
+        plugin.substitute(channel_tuple, substitute)
+        self._memo.invalidate()
+
+        # ...and bring up its substitute in its place
+        changes = {}
+        actions = [_create_assign_action(changes, dca_num, channel_tuple) for dca_num in dca_nums]
+        actions.extend(_calculate_mutes(changes))
+        self._transmit(actions, False)
+
+    def _record_history(self, changes):
+        '''Remembers the changes that are about to be committed, so they may be stepped back from
+
+        Only the actions that actually alter what is currently active are kept (a force clear,
+        for instance, unassigns far more than is assigned). Mutes are not kept, as they can be
+        derived again from the assigns when inverting.
+        '''
+        current_assigns = self.root.child(0).children
+        actions = []
+        previous_names = {}
+        for change in changes:
+            block_node = current_assigns[change[1]['dca']] if 'dca' in change[1] else None
+            if change[0] == 'assign':
+                if change[1]['strip'] not in block_node.getChildValues():
+                    actions.append(change)
+            elif change[0] == 'unassign':
+                if change[1]['strip'] in block_node.getChildValues():
+                    actions.append(change)
+            elif change[0] == 'rename':
+                if change[1]['dca'] not in previous_names:
+                    previous_names[change[1]['dca']] = block_node.data()
+                actions.append(change)
+
+        if actions:
+            self._history.append((actions, previous_names))
+
+    def _commit_changes(self, changes):
+        '''Updates the currently active assigns with changes that have been transmitted'''
+        # Anything calculated from the previous state is now out of date
+        self._cached_changes = []
+
+        current_assigns = self.root.child(0).children
+        changes = _expand_choirs(changes)
+        for change in changes:
+            if change[0] == 'assign':
+                block_node = current_assigns[change[1]['dca']]
+                self._add_node(block_node.index(),
+                               ModelsEntry(change[1]['strip'], parent=block_node))
+            elif change[0] == 'unassign':
+                block_node = current_assigns[change[1]['dca']]
+                try:
+                    entry_num = block_node.getChildValues().index(change[1]['strip'])
+                except ValueError:
+                    pass
+                else:
+                    entry_node = block_node.child(entry_num)
+                    self._remove_node(entry_node.index())
+            elif change[0] == 'rename':
+                current_assigns[change[1]['dca']].setData(change[1]['name'], Qt.EditRole)
+                if self._predictive_row_enabled:
+                    self.root.child(1).children[change[1]['dca']].setInherited(change[1]['name'])
+
+        if self._journal:
+            self._journal.record(
+                [change for change in changes if change[0] in ('assign', 'unassign', 'rename')])
+            if self._journal.needs_compaction():
+                self._journal.compact(*self._journal_state())
+
+    def _journal_state(self):
+        current_assigns = self.root.child(0).children
+        return ([dca_node.serialiseName() for dca_node in current_assigns],
+                [dca_node.getChildValues() for dca_node in current_assigns])
+
+    def _prearm(self, silent_changes):
+        '''Transmits the inaudible part of the next cue's changes ahead of it being called
+
+        What has been pre-armed is not committed to the currently active (the assigned strips
+        are still muted, which the currently active has no way of representing), but is
+        remembered so that it isn't sent again when the cue is called.
+
+        Note: this transmits MIDI immediately
+        '''
+        undelivered = self._transmit(self._settle_prearmed(silent_changes), False)
+        self._prearmed = _without(silent_changes, undelivered)
+
+    def _settle_prearmed(self, changes):
+        '''Returns what of the given changes still needs transmitting, given what was pre-armed
+
+        Anything pre-armed that is not part of the given changes is reverted first.
+        '''
+        if not self._prearmed:
+            return changes
+
+        prearmed = self._prearmed
+        self._prearmed = []
+
+        renamed = [change[1]['dca'] for change in changes if change[0] == 'rename']
+        current_assigns = self.root.child(0).children
+        to_transmit = []
+
+        for action in prearmed:
+            if action in changes:
+                continue
+            if action[0] == 'assign':
+                to_transmit.append(_create_unassign_action({},
+                                                           action[1]['dca'],
+                                                           action[1]['strip']))
+            elif action[0] == 'rename' and action[1]['dca'] not in renamed:
+                to_transmit.append(_create_rename_action(action[1]['dca'],
+                                                         current_assigns[action[1]['dca']].data()))
+
+        to_transmit.extend([change for change in changes if change not in prearmed])
+        return to_transmit
+
+    def _transmit(self, changes, committing=True):
+        '''Transmits changes to the desk (and any mirrors), returning those that weren't delivered
+
+        Sending a message that fails is retried, backing off between attempts. Once a message
+        has been given up on, it - and everything after it - is added to the dead letters, to be
+        resent when asked. (Whether what's resent should then be committed is remembered.)
+        '''
+        # The mirrors are given the changes first, so they transmit whilst we do
+        for mirror in self._mirrors:
+            mirror.submit(changes)
+
+        dca_device = self._output.device()
+        resolved = None
+        if dca_device:
+            resolved = self._memo.deliveries(
+                changes, dca_device,
+                lambda: resolve_deliveries(changes, dca_device, self._output.profile()))
+
+        undelivered = []
+        for change, command, args, dict_msgs in compile_deliveries(changes,
+                                                                   dca_device,
+                                                                   self._desk_shadow,
+                                                                   self._output.profile(),
+                                                                   resolved):
+            if undelivered:
+                undelivered.append(change)
+                continue
+            if command:
+                self._desk_shadow.expect_echo(command, args)
+            if not self._deliver(dict_msgs):
+                undelivered.append(change)
+            elif command:
+                self._desk_shadow.record(command, args)
+
+        if undelivered:
+            logger.error('%d DCA changes could not be sent to the desk.', len(undelivered))
+            self._dead_letters.extend((change, committing) for change in undelivered)
+        return undelivered
+
+    def _deliver(self, dict_msgs):
+        if not dict_msgs:
+            return True
+
+        # (The output looks itself up again after a failure, so even an immediate retry can
+        # find a port that's come back.)
+        patient = current_thread() is not main_thread()
+        attempts = self.DELIVERY_ATTEMPTS if patient else 2
+
+        delay = self.RETRY_DELAY
+        for attempt in range(attempts):
+            try:
+                self._output.send_batch(dict_msgs)
+                return True
+            except Exception as exception: # pylint: disable=broad-except
+                if attempt + 1 == attempts:
+                    logger.error('Unable to send MIDI to the desk: %s', exception)
+                    return False
+                if patient:
+                    time.sleep(delay)
+                    delay *= 2
+        return False
+
+    def _supersede_dead_letters(self):
+        '''Drops what couldn't be delivered, as what is active is about to be moved on
+
+        Undelivered changes were never committed, so whatever is calculated from what is
+        active already allows for them: resending them afterwards would replay a state that
+        has since been moved on from.
+        '''
+        if not self._dead_letters:
+            return
+
+        uncommitted = len([change for change, committing in self._dead_letters if not committing])
+        if uncommitted:
+            logger.warning('%d undelivered DCA changes (e.g. from a role swap) have been dropped; '
+                           'a force clear will bring the desk back in step.', uncommitted)
+        self._dead_letters = []
+
+    def dead_letters(self):
+        '''Returns the changes that could not be delivered, and are waiting to be resent'''
+        return [change for change, _ in self._dead_letters]
+
+    def resend_outstanding(self):
+        '''Transmits again what could not be delivered, committing whatever now is
+
+        Note: this transmits MIDI immediately
+        '''
+        if not self._dead_letters:
+            return
+
+        outstanding = self._dead_letters
+        self._dead_letters = []
+
+        self._cue_in_progress = True
+        try:
+            to_commit = []
+            for num, (change, committing) in enumerate(outstanding):
+                if self._transmit([change], committing):
+                    # Still not getting through: keep the rest for next time
+                    self._dead_letters.extend(outstanding[num + 1:])
+                    break
+                if committing:
+                    to_commit.append(change)
+            self._commit_changes(to_commit)
+        finally:
+            self._cue_in_progress = False
+
+        if self._predictive_row_enabled:
+            self.regenerate_current()
+
+def _collapse_actions(actions, initial_names, initial_assigns):
+    '''Reduces a sequence of actions to the net change from the state they were applied to
+
+    Assigns and unassigns that cancel each other out are dropped, as are renames that end up
+    back at the name the DCA started with. The mutes are recalculated from what remains.
+    '''
+    final_names = {}
+    final_assigns = {}
+    for action in _expand_choirs(actions):
+        if action[0] in ('assign', 'unassign'):
+            final_assigns[(action[1]['dca'], action[1]['strip'])] = action[0] == 'assign'
+        elif action[0] == 'rename':
+            final_names[action[1]['dca']] = action[1]['name']
+
+    cue_actions = []
+    assign_changes = {}
+
+    for dca_num, new_name in final_names.items():
+        if new_name != initial_names[dca_num]:
+            cue_actions.append(_create_rename_action(dca_num, new_name))
+
+    for (dca_num, channel_tuple), assigned in final_assigns.items():
+        if assigned == (channel_tuple in initial_assigns[dca_num]):
+            continue
+        if assigned:
+            cue_actions.append(_create_assign_action(assign_changes, dca_num, channel_tuple))
+        else:
+            cue_actions.append(_create_unassign_action(assign_changes, dca_num, channel_tuple))
+
+    cue_actions.extend(_calculate_mutes(assign_changes))
+    return cue_actions
 
 def _calculate_mutes(assign_changes):
     cue_actions = []
@@ -441,6 +1110,115 @@ def _create_unassign_action(assign_changes, dca_num, channel_tuple, dry_run=Fals
         'dca': dca_num
     }]
 
+def _expand_choirs(changes):
+    '''Replaces choir-level actions with the same action for each of the choir's members
+
+    A member is only included once per action and DCA, however many of the choir groupings (or
+    individual actions) it is part of.
+    '''
+    if not any(change[1]['strip'][0] == 'choir' for change in changes):
+        return changes
+
+    resolve_choir = get_plugin('DcaPlotter').resolve_choir
+    seen = {(change[0], change[1].get('dca'), change[1]['strip'])
+            for change in changes if change[1]['strip'][0] != 'choir'}
+
+    expanded = []
+    for change in changes:
+        if change[1]['strip'][0] != 'choir':
+            expanded.append(change)
+            continue
+        for member in resolve_choir(change[1]['strip'][1]):
+            key = (change[0], change[1].get('dca'), member)
+            if key in seen:
+                continue
+            seen.add(key)
+            expanded.append([change[0], dict(change[1], strip=member)])
+    return expanded
+
+def _is_known_strip(channel_tuple, session_assigns):
+    strip_type, strip_id = channel_tuple
+    if strip_type in ('input', 'fx'):
+        return isinstance(strip_id, int) and 0 < strip_id <= len(session_assigns[strip_type])
+    if strip_type in ('role', 'choir'):
+        return strip_id in session_assigns[strip_type]
+    return False
+
+def _without(changes, undelivered):
+    '''Returns the changes (choir groupings expanded) less those that weren't delivered'''
+    if not undelivered:
+        return changes
+    return [change for change in _expand_choirs(changes) if change not in undelivered]
+
+def _is_force_clear(cue):
+    return not isinstance(cue, DcaChangeCue) and cue.properties().get('force_clear')
+
+def _order_by_audibility(changes):
+    '''Orders actions so that those with an audible effect are transmitted as soon as possible
+
+    * Strips being unmuted, one at a time: its assign(s) and then its unmute. (So that the strip
+      is under the control of its DCA by the time it can be heard.)
+    * Mutes
+    * The unassigns of strips that have just been muted
+    * Anything else (strips moving between DCAs), in the order they were calculated
+    * Renames
+    '''
+    unmuting = {change[1]['strip'] for change in changes if change[0] == 'unmute'}
+    muting = {change[1]['strip'] for change in changes if change[0] == 'mute'}
+
+    incoming = {}
+    unmutes = []
+    mutes = []
+    outgoing = []
+    others = []
+    renames = []
+    for change in changes:
+        if change[0] == 'unmute':
+            unmutes.append(change)
+        elif change[0] == 'mute':
+            mutes.append(change)
+        elif change[0] == 'rename':
+            renames.append(change)
+        elif change[0] == 'assign' and change[1]['strip'] in unmuting:
+            incoming.setdefault(change[1]['strip'], []).append(change)
+        elif change[0] == 'unassign' and change[1]['strip'] in muting:
+            outgoing.append(change)
+        else:
+            others.append(change)
+
+    ordered = []
+    for unmute in unmutes:
+        ordered.extend(incoming.get(unmute[1]['strip'], []))
+        ordered.append(unmute)
+    ordered.extend(mutes)
+    ordered.extend(outgoing)
+    ordered.extend(others)
+    ordered.extend(renames)
+    return ordered
+
+# The orders actions may be transmitted in, selectable per DCA-capable device
+# through the session config's "message_order" mapping.
+MESSAGE_ORDERS = {
+    'audible': _order_by_audibility,
+    'calculated': list,
+}
+
+def _message_order(device):
+    '''Returns the function that puts actions in the order configured for the given device'''
+    message_order = get_plugin('DcaPlotter').SessionConfig.get('message_order', {})
+    order = message_order.get(device, 'audible')
+    if order not in MESSAGE_ORDERS:
+        logger.warning('Unknown message order "%s" configured for %s; using "audible" instead.',
+                       order, device)
+        order = 'audible'
+    return MESSAGE_ORDERS[order]
+
+def _silent_actions(changes):
+    '''Returns the actions that have no audible effect: renames, and assigns of muted strips'''
+    unmuting = [change[1]['strip'] for change in changes if change[0] == 'unmute']
+    return [change for change in changes
+            if change[0] == 'rename' or change[0] == 'assign' and change[1]['strip'] in unmuting]
+
 def _update_assign_changes(assign_changes, action, channel_tuple):
 
     # Assign changes key:
@@ -460,65 +1238,136 @@ def _update_assign_changes(assign_changes, action, channel_tuple):
         elif assign_changes[channel_tuple] == 1:
             assign_changes[channel_tuple] = -1
 
-def determine_midi_messages(changes):
-    midi_plugin_config = get_plugin('MidiFixtureControl').SessionConfig
-    if not midi_plugin_config['dca_device']:
+def channel_type_variants(profile):
+    '''Returns the channel types the desk's profile uses for each of our types of strip'''
+    channel_types = profile.parameter_values('mute')['channelType']
+    return {
+        'dca': 'dca',
+        'fx': 'fx_return' if 'fx_return' in channel_types else 'fx',
+        'input': 'input_mono' if 'input_mono' in channel_types else 'input',
+    }
+
+def determine_desk_commands(changes, profile):
+    '''Resolves changes to the commands - and their arguments - that the desk should be sent'''
+    channel_types = channel_type_variants(profile)
+
+    commands = []
+    for change in _expand_choirs(changes):
+        command = _determine_desk_command(change, channel_types)
+        if command:
+            commands.append(command)
+
+    return commands
+
+def _determine_desk_command(change, channel_types):
+    command = ""
+
+    strip_type = change[1]['strip'][0]
+    strip_number = change[1]['strip'][1]
+
+    # Resolve Role aliasing
+    if strip_type == 'role':
+        role_assign = get_plugin('DcaPlotter').resolve_role(strip_number)
+        if not role_assign:
+            logger.warning("A role has just been used that does not have anything assigned to it.")
+            return None
+        strip_type = role_assign[0]
+        strip_number = role_assign[1]
+
+    if strip_type != 'dca':
+        # Support e.g. Microphone 2 being actually Desk Channel 7, and substitutions
+        strip_type, strip_number = get_plugin('DcaPlotter').resolve_desk_channel(
+            (strip_type, strip_number))
+
+    args = {
+        "channelType": channel_types.get(strip_type, strip_type),
+        "channelNum": strip_number
+    }
+
+    if change[0] == 'assign' or change[0] == 'unassign':
+        command = 'assignToDca'
+        args['assignAction'] = 'assign' if change[0] == 'assign' else 'unassign'
+        args['dcaNum'] = change[1]['dca'] + 1
+
+    elif change[0] == 'mute' or change[0] == "unmute":
+        command = 'mute'
+        args['muteAction'] = 'mute' if change[0] == 'mute' else 'unmute'
+
+    elif change[0] == 'rename':
+        command = 'setName'
+        args["asciiString"] = change[1]['name']
+
+    return (command, args)
+
+def compile_deliveries(changes, device, desk_shadow, profile=None, resolved=None):
+    '''Orders changes as configured for the given device, and resolves each to its MIDI
+
+    Returns a list of (change, command, args, messages) - with the command None where there
+    is nothing to send, such as when the desk already has what the change would give it. The
+    desk shadow is left for the caller to update, as and when the messages are delivered.
+
+    If the changes have already been resolved (see `resolve_deliveries()`), that may be given.
+    '''
+    if resolved is None:
+        resolved = resolve_deliveries(changes, device, profile)
+
+    deliveries = []
+    for change, command, args, dict_msgs in resolved:
+        if command and desk_shadow.is_redundant(command, args):
+            deliveries.append((change, None, None, []))
+            continue
+        deliveries.append((change, command, args, dict_msgs))
+
+    return deliveries
+
+def resolve_deliveries(changes, device, profile=None):
+    '''Orders changes as configured for the given device, and resolves each to its MIDI
+
+    As `compile_deliveries()`, but without regard to what the desk already has.
+    '''
+    if not device:
         logger.error("Please identify a device capable of remote VCA/DCA control.")
         return []
 
-    profile = get_plugin('MidiFixtureControl').get_profile(midi_plugin_config['dca_device'])
-    fx_variant = 'fx_return' if 'fx_return' in profile.parameter_values('mute')['channelType'] else 'fx'
-    input_variant = 'input_mono' if 'input_mono' in profile.parameter_values('mute')['channelType'] else 'input'
+    profile = profile or get_plugin('MidiFixtureControl').get_profile(device)
+    channel_types = channel_type_variants(profile)
 
-    strip_assigns = get_plugin('DcaPlotter').SessionConfig['assigns']
+    deliveries = []
+    for change in _message_order(device)(_expand_choirs(changes)):
+        command = _determine_desk_command(change, channel_types)
+        if not command:
+            deliveries.append((change, None, None, []))
+            continue
+        deliveries.append((change, command[0], command[1], profile.build_command(*command)))
 
-    messages = []
-    for change in changes:
-        command = ""
+    return deliveries
 
-        strip_type = change[1]['strip'][0]
-        strip_number = change[1]['strip'][1]
+def resolve_desk_commands(changes, device, profile=None):
+    '''Orders changes as configured for the given device, and resolves them to its commands'''
+    if not device:
+        return []
 
-        # Temporarily skip choir groupings
-        if strip_type == 'choir':
-            continue
+    profile = profile or get_plugin('MidiFixtureControl').get_profile(device)
+    changes = _message_order(device)(_expand_choirs(changes))
+    return determine_desk_commands(changes, profile)
 
-        # Resolve Role aliasing
-        if strip_type == 'role':
-            role_assign = get_plugin('DcaPlotter').resolve_role(strip_number)
-            if not role_assign:
-                logger.warning("A role has just been used that does not have anything assigned to it.")
-                continue
-            strip_type = role_assign[0]
-            strip_number = role_assign[1]
-
-        if strip_type != 'dca':
-            # Support e.g. Microphone 2 being actually Desk Channel 7
-            strip_number = strip_assigns[strip_type][strip_number - 1]['in']
-
-        channelType = strip_type
-        if strip_type == 'fx':
-            channelType = fx_variant
-        elif strip_type == 'input':
-            channelType = input_variant
-
-        args = {
-            "channelType": channelType,
-            "channelNum": strip_number
-        }
+def determine_midi_messages(changes, desk_shadow=None, device=None, profile=None):
+    if device is None:
+        device = get_plugin('MidiFixtureControl').SessionConfig['dca_device']
+    if not device:
+        logger.error("Please identify a device capable of remote VCA/DCA control.")
+        return []
 
-        if change[0] == 'assign' or change[0] == 'unassign':
-            command = 'assignToDca'
-            args['assignAction'] = 'assign' if change[0] == 'assign' else 'unassign'
-            args['dcaNum'] = change[1]['dca'] + 1
+    profile = profile or get_plugin('MidiFixtureControl').get_profile(device)
 
-        elif change[0] == 'mute' or change[0] == "unmute":
-            command = 'mute'
-            args['muteAction'] = 'mute' if change[0] == 'mute' else 'unmute'
+    messages = []
+    for command, args in determine_desk_commands(changes, profile):
 
-        elif change[0] == 'rename':
-            command = 'setName'
-            args["asciiString"] = change[1]['name']
+        # Skip anything that wouldn't change what the desk already has
+        if desk_shadow:
+            if desk_shadow.is_redundant(command, args):
+                continue
+            desk_shadow.record(command, args)
 
         messages.extend(profile.build_command(command, args))
 
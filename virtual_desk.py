@@ -0,0 +1,135 @@
+# This file is a derivation of work on - and as such shares the same
+# licence as - Linux Show Player
+#
+# Linux Show Player:
+#   Copyright 2012-2021 Francesco Ceruti <ceppofrancy@gmail.com>
+#
+# This file:
+#   Copyright 2021 s0600204
+#
+# Linux Show Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Linux Show Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=missing-docstring
+
+from collections import deque
+import time
+
+# pylint: disable=import-error
+from lisp.plugins.midi.midi_utils import midi_from_dict
+
+from .desk_decoder import DeskMessageDecoder
+from .tracker.desk_shadow import DeskShadow
+from .tracker.model import determine_desk_commands
+
+class VirtualDesk:
+    '''A stand-in for a DCA-capable desk, for when there isn't a real one to hand
+
+    It has the same ``send()`` as the Midi plugin, so the tracker can be given one to transmit
+    to. What it is sent is interpreted through the desk's profile, and the resulting names,
+    DCA assignments and mutes are kept.
+
+    The desk's input buffer and the time it takes to process each message are emulated:
+    messages that arrive when the buffer is full are dropped, and those processed later than
+    `late_after` seconds after arriving are reported as late. Time is taken from `clock`, so
+    a simulated clock may be given to avoid having to wait.
+
+    If given, `echo` is called with every message once processed, as a desk echoes the changes
+    made to it (e.g. to give to a DeskFeedback).
+    '''
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, profile, buffer_size=256, processing_delay=0.0005, late_after=0.05,
+                 clock=time.monotonic, echo=None):
+        # pylint: disable=too-many-arguments
+        self._profile = profile
+        self._decoder = DeskMessageDecoder(profile)
+        self._buffer = deque()
+        self._buffer_size = buffer_size
+        self._processing_delay = processing_delay
+        self._late_after = late_after
+        self._clock = clock
+        self._echo = echo
+        self._busy_until = 0
+        self._state = DeskShadow()
+
+        self.received = 0
+        self.processed = 0
+        self.dropped = []
+        self.late = []
+        self.max_latency = 0
+
+    def discrepancies(self, tracker):
+        '''Returns where what the tracker believes is active and the desk's state differ
+
+        Each is a tuple of (key, believed, actual).
+        '''
+        self.flush()
+        believed = DeskShadow()
+        for command, args in determine_desk_commands(tracker.active_changes(), self._profile):
+            believed.record(command, args)
+        return believed.differences(self._state)
+
+    def flush(self):
+        '''Processes everything still in the input buffer'''
+        self._process_until(float('inf'))
+
+    def report(self):
+        self._process_until(self._clock())
+        return {
+            'received': self.received,
+            'processed': self.processed,
+            'buffered': len(self._buffer),
+            'dropped': len(self.dropped),
+            'late': len(self.late),
+            'max_latency': self.max_latency,
+        }
+
+    def send(self, _, message):
+        now = self._clock()
+        self._process_until(now)
+        self.received += 1
+
+        if len(self._buffer) >= self._buffer_size:
+            self.dropped.append((now, message))
+            return
+
+        self._buffer.append((now, message))
+
+    def _process_until(self, now):
+        while self._buffer:
+            arrived, message = self._buffer[0]
+            finished = max(arrived, self._busy_until) + self._processing_delay
+            if finished > now:
+                return
+
+            self._buffer.popleft()
+            self._busy_until = finished
+            self.processed += 1
+
+            latency = finished - arrived
+            self.max_latency = max(self.max_latency, latency)
+            if latency > self._late_after:
+                self.late.append((arrived, latency, message))
+
+            for command, args in self._decoder.decode(message):
+                self._state.record(command, args)
+            if self._echo:
+                self._echo(message)
+
+    def change_by_hand(self, command, args):
+        '''Makes a change as if by hand on the desk (which is echoed, as any other change)'''
+        self._state.record(command, args)
+        if self._echo:
+            for dict_msg in self._profile.build_command(command, args):
+                self._echo(midi_from_dict(dict_msg))